@@ -0,0 +1,70 @@
+"""Benchmark of the analytics backends on a large load curve."""
+
+import argparse
+from datetime import datetime, timedelta
+import time
+import tracemalloc
+
+import numpy as np
+
+from myelectricaldatapy.analytics import EnedisAnalytics
+from myelectricaldatapy.readings import Readings
+
+PARAMS = {
+    "convertKwh": True,
+    "intervals": [("22:00:00", "06:00:00"), ("12:30:00", "14:00:00")],
+    "groupby": True,
+    "summary": True,
+    "prices": {
+        "standard": {"blue": 0.16, "white": 0.19, "red": 0.76},
+        "offpeak": {"blue": 0.13, "white": 0.15, "red": 0.16},
+    },
+    "cum_value": {"standard": 1000},
+    "output": "dataframe",
+}
+
+
+def load_curve(days: int) -> tuple[Readings, dict[str, str]]:
+    """Return a 30 minutes load curve and tempo days."""
+    start = np.datetime64("2021-01-01T00:30:00", "s").astype(np.int64)
+    timestamps = start + np.arange(days * 48, dtype=np.int64) * 1800
+    values = np.random.default_rng(0).integers(100, 3000, len(timestamps))
+    colors = ("blue", "white", "red")
+    tempo = {
+        (datetime(2021, 1, 1) + timedelta(days=day)).strftime("%Y-%m-%d"): colors[
+            day % 3
+        ]
+        for day in range(days)
+    }
+    return Readings(timestamps, values, np.full(len(timestamps), 30)), tempo
+
+
+def measure(data: Readings, tempo: dict[str, str], backend: str, repeat: int) -> None:
+    """Print the best time and the peak memory of a backend."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        EnedisAnalytics(data).get_data_analytics(tempo=tempo, backend=backend, **PARAMS)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    EnedisAnalytics(data).get_data_analytics(tempo=tempo, backend=backend, **PARAMS)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{backend:>8}: {min(timings) * 1000:8.1f} ms {peak / 2**20:8.1f} MiB peak")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=1095, help="days of readings")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per backend")
+    args = parser.parse_args()
+
+    data, tempo = load_curve(args.days)
+    print(f"{len(data)} readings")
+    for backend in ("pandas", "numpy"):
+        measure(data, tempo, backend, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
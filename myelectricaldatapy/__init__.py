@@ -1,5 +1,11 @@
 """myelectricaldatapy package."""
 
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+from .cache import EnedisCache
 from .exceptions import (
     EnedisException,
     HttpRequestError,
@@ -7,13 +13,38 @@ from .exceptions import (
     TimeoutExceededError,
 )
 from .myelectricaldata import Enedis
-from .mypdl import EnedisByPDL
+from .throttle import RetryPolicy, TokenBucket
+
+if TYPE_CHECKING:
+    from .fleet import EnedisFleet
+    from .mypdl import EnedisByPDL
+
+# Imported on first use, they load NumPy (and pandas for the statistics).
+_LAZY = {"EnedisByPDL": ".mypdl", "EnedisFleet": ".fleet"}
 
 __all__ = [
     "Enedis",
     "EnedisByPDL",
+    "EnedisCache",
     "EnedisException",
+    "EnedisFleet",
     "HttpRequestError",
     "LimitReached",
+    "RetryPolicy",
     "TimeoutExceededError",
+    "TokenBucket",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import classes on first use."""
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    """List the package attributes, including the lazy ones."""
+    return sorted({*globals(), *_LAZY})
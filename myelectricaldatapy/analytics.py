@@ -2,25 +2,133 @@
 
 from __future__ import annotations
 
-from collections.abc import Collection
+from collections.abc import Collection, Iterable, Sequence
 from datetime import datetime as dt, timedelta
+import logging
 import re
-from typing import Any
+from typing import Any, Literal, cast
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
+from . import numpy_analytics
 from .const import ATTR_OFFPEAK, ATTR_STANDARD
+from .numpy_analytics import (
+    NOTES,
+    TEMPO_COLORS,
+    offpeak_mask,
+    price_table,
+    tempo_categories,
+)
+from .readings import Readings
 from .tz import LOCAL_TIMEZONE
 
+_LOGGER = logging.getLogger(__name__)
+
+OutputFormat = Literal["records", "dataframe", "columns", "recarray", "iter"]
+
+Backend = Literal["pandas", "numpy"]
+
+
+def _codes(values: pd.Series, categories: Sequence[str]) -> npt.NDArray[np.intp]:
+    """Return the position of values in categories, -1 if unknown."""
+    labels = pd.Categorical(values)
+    positions = np.array(
+        [
+            categories.index(label) if label in categories else -1
+            for label in labels.categories
+        ]
+        + [-1]
+    )
+    codes: npt.NDArray[np.intp] = positions[labels.codes]
+    return codes
+
+
+def _labels(values: pd.Series) -> pd.Series:
+    """Return the labels of a categorical column, None if missing."""
+    labels = values.astype(object)
+    return labels.where(labels.notna(), None)
+
+
+def format_output(df: pd.DataFrame, output: OutputFormat) -> Any:
+    """Return the frame in the output format.
+
+    Labels of categorical columns are returned as strings (None if missing),
+    except in the dataframe output. The frame and arrays returned are copies:
+    changing them does not change the frame they come from.
+    """
+    if output != "dataframe":
+        df = df.assign(
+            **{
+                str(column): _labels(df[column])
+                for column, dtype in df.dtypes.items()
+                if isinstance(dtype, pd.CategoricalDtype)
+            }
+        )
+    if output == "records":
+        return df.to_dict(orient="records")
+    if output == "dataframe":
+        return df.copy()
+    if output == "columns":
+        return {
+            column: (
+                values.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+                if isinstance(values.dtype, pd.DatetimeTZDtype)
+                else values.to_numpy(copy=True)
+            )
+            for column, values in df.items()
+        }
+    if output == "recarray":
+        return df.to_records(index=False)
+    if output == "iter":
+        columns = list(df.columns)
+        return (
+            dict(zip(columns, row)) for row in df.itertuples(index=False, name=None)
+        )
+    raise ValueError(f"Unknown output format: {output}")
+
+
+def analyze(
+    data: Collection[Collection[str]] | Readings, params: dict[str, Any]
+) -> Any:
+    """Return EnedisAnalytics(data).get_data_analytics(**params).
+
+    Module level function, so it can run in worker processes.
+    """
+    return EnedisAnalytics(data).get_data_analytics(**params)
+
 
 class EnedisAnalytics:
     """Data analaytics."""
 
     local_timezone = LOCAL_TIMEZONE
 
-    def __init__(self, data: Collection[Collection[str]]) -> None:
-        """Initialize Dataframe."""
-        self.df = pd.DataFrame(data)
+    def __init__(self, data: Collection[Collection[str]] | Readings) -> None:
+        """Initialize Dataframe.
+
+        data: readings as returned by the API (list of dict) or Readings
+
+        Readings are parsed once, on the first query, into a base frame which
+        is never modified: each call of get_data_analytics derives its own
+        frame from it, so an instance answers any number of queries. df is
+        the result of the last query.
+        """
+        if isinstance(data, Readings):
+            self.df = pd.DataFrame(
+                {
+                    "date": data.timestamps.astype("datetime64[s]"),
+                    "value": data.values,
+                }
+            )
+            if not data.daily:
+                self.df["interval_length"] = data.intervals
+        else:
+            self.df = pd.DataFrame(data)
+        self._data = data
+        self._base: pd.DataFrame | None = None
+        self._readings = data if isinstance(data, Readings) else None
+        self._step_hour = "interval_length" in self.df
 
     def get_data_analytics(
         self,
@@ -34,68 +142,104 @@ class EnedisAnalytics:
         cum_price: dict[str, Any] | None = None,
         prices: dict[str, Any] | None = None,
         tempo: dict[str, str] | None = None,
+        output: OutputFormat = "records",
+        downcast: bool = False,
+        backend: Backend = "pandas",
     ) -> Any:
-        """Convert data to analyze."""
+        """Convert data to analyze.
+
+        notes and tempo are categorical columns. With downcast, float columns
+        are returned as float32 (sums are computed in float64 beforehand).
+
+        backend: "pandas", or "numpy" to compute on arrays (see
+            numpy_analytics), with the same results. Values are float64 and
+            only the analytics columns are returned.
+
+        output: format of the result
+            records:    list of dict, one per row
+            dataframe:  pandas DataFrame
+            columns:    dict of NumPy arrays by column (dates in UTC)
+            recarray:   NumPy record array
+            iter:       lazy iterator of dict, one per row
+        """
+        if backend == "numpy":
+            return self._numpy_analytics(
+                output,
+                convertKwh=convertKwh,
+                convertUTC=convertUTC,
+                start_date=start_date,
+                intervals=intervals,
+                groupby=groupby,
+                summary=summary,
+                cum_value=cum_value,
+                cum_price=cum_price,
+                prices=prices,
+                tempo=tempo,
+                downcast=downcast,
+            )
         cum_value = cum_value or {}
         cum_price = cum_price or {}
+        base = self._base_frame()
+        nbytes = 0
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            nbytes = int(base.memory_usage(deep=True).sum())
+        # Columns are replaced, never written in place, and the frames
+        # returned are copies: base is unchanged.
+        self.df = base.copy(deep=False)
         step_hour = False
         if not self.df.empty:
-            # Convert str to datetime
-            try:
-                self.df.date = pd.to_datetime(self.df.date, format="%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                self.df.date = pd.to_datetime(self.df.date, format="%Y-%m-%d")
-            self.df.date = self.df.date.dt.tz_localize(self.local_timezone)
-
             if convertUTC:
-                self.df.date = pd.to_datetime(
-                    self.df.date, utc=True, format="%Y-%m-%d %H:%M:%S"
-                )
+                self.df.date = self.df.date.dt.tz_convert("UTC")
 
-            # Subtract 1 minute at hour
-            # because Pandas considers hour as the next hour while
-            # for Enedis it is the hour before
-            if "interval_length" in self.df:
-                step_hour = True
-                self.df.loc[
-                    (self.df.date.dt.minute == 0),
-                    "date",
-                ] = self.df.date - timedelta(minutes=1)
+            # Load curve readings are dated at the end of their interval
+            # (see _interval_start)
+            step_hour = self._step_hour
 
             if start_date:
                 dt_start_date = pd.to_datetime(start_date, format="%Y-%m-%d %H:%M:%S")
                 if dt_start_date.tzinfo is None:
                     dt_start_date = dt_start_date.tz_localize(self.local_timezone)
-                self.df = self.df[(self.df.date > dt_start_date)]
+                self.df = self.df[(self.df.date > dt_start_date)].copy()
 
             self.df.index = self.df.date
 
             # Add mark
-            self.df["notes"] = ATTR_STANDARD
+            self.df["notes"] = pd.Categorical.from_codes(
+                np.full(len(self.df), NOTES.index(ATTR_STANDARD), dtype=np.int8),
+                categories=NOTES,
+            )
 
         if self.df.empty:
-            return self.df.to_dict(orient="records")
-
-        self.df.interval_length = (
-            self.df.interval_length.transform(self._weighted_interval)
-            if step_hour
-            else 1
-        )
+            return format_output(self.df, output)
 
         if convertKwh:
-            self.df.value = (
-                pd.to_numeric(self.df.value) / 1000 * self.df.interval_length
-            )
-        else:
-            self.df.value = pd.to_numeric(self.df.value) * self.df.interval_length
+            self.df.value = self.df.value / 1000
+        if step_hour:
+            self.df.value = self.df.value * self.df.interval_length
 
-        if intervals:
+        # Daily readings have no time of day, they stay standard.
+        if intervals and step_hour:
             self._get_data_interval(intervals)
 
         if groupby:
-            freq = "h" if step_hour else "D"
+            starts = self._interval_start()
+            if step_hour:
+                # Start of the local hour, kept in the offset of the interval
+                # (the floor of the hour repeated when DST ends is ambiguous).
+                dates = starts - pd.to_timedelta(
+                    starts.dt.minute * 60 + starts.dt.second, unit="s"
+                )
+            else:
+                dates = starts.dt.floor("D")
+            buckets = pd.DataFrame(
+                {
+                    "notes": self.df.notes.array,
+                    "date": dates.array,
+                    "value": self.df.value.array,
+                }
+            )
             self.df = (
-                self.df.groupby(["notes", pd.Grouper(key="date", freq=freq)])["value"]
+                buckets.groupby(["notes", "date"], observed=True)["value"]
                 .sum()
                 .reset_index()
             )
@@ -103,36 +247,160 @@ class EnedisAnalytics:
         if tempo:
             self._set_tempo_days(tempo)
 
-        notes = list(self.df.notes.drop_duplicates())
         if prices:
-            for mode, values in prices.items():
-                if isinstance(values, dict):
-                    for offset, price in values.items():
-                        if tempo and offset in ["blue", "white", "red"]:
-                            self.df.loc[
-                                (self.df.notes == mode) & (self.df.tempo == offset),
-                                "price",
-                            ] = self.df.value * price
-                        elif offset == "price":
-                            self.df.loc[(self.df.notes == mode), "price"] = (
-                                self.df.value * price
-                            )
-                        else:
-                            self.df.loc[(self.df.notes == mode), "price"] = None
-
+            self.df["price"] = self.df.value * self._unit_prices(prices, tempo)
             if summary:
-                for note in notes:
-                    self.df.loc[(self.df.notes == note), "sum_price"] = self.df[
-                        (self.df.notes == note)
-                    ].price.cumsum() + cum_price.get(note, 0)
+                self.df["sum_price"] = self._cumsum("price", cum_price)
 
         if summary:
-            for note in notes:
-                self.df.loc[(self.df.notes == note), "sum_value"] = self.df[
-                    (self.df.notes == note)
-                ].value.cumsum() + cum_value.get(note, 0)
+            self.df["sum_value"] = self._cumsum("value", cum_value)
 
-        return self.df.to_dict(orient="records")
+        if downcast:
+            self.df = self.df.astype(
+                {
+                    column: np.float32
+                    for column, dtype in self.df.dtypes.items()
+                    if dtype == np.float64
+                }
+            )
+        if nbytes:
+            _LOGGER.debug(
+                "Frame memory: %s bytes parsed, %s bytes analyzed",
+                nbytes,
+                self.memory_usage(),
+            )
+
+        return format_output(self.df, output)
+
+    def _base_frame(self) -> pd.DataFrame:
+        """Return the parsed readings, built on first use and never modified.
+
+        Dates are timezone-aware local timestamps (also the index), values
+        are numeric and load curve interval lengths are in hours.
+        """
+        if self._base is not None:
+            return self._base
+        base = self.df
+        if not base.empty:
+            base = base.assign(
+                date=self._localize(base.date), value=pd.to_numeric(base.value)
+            )
+            if self._step_hour:
+                base["interval_length"] = self._weights(base.interval_length)
+            base.index = base.date
+        self._base = base
+        return base
+
+    def _weights(self, lengths: pd.Series) -> pd.Series:
+        """Return interval lengths in hours (1 when unknown)."""
+        if pd.api.types.is_numeric_dtype(lengths):
+            # Interval lengths in minutes (Readings)
+            return (lengths / 60).where(lengths > 0, 1)
+        # A handful of distinct values (PT10M, PT15M, PT30M, PT60M)
+        categorical = pd.Categorical(lengths)
+        table = np.array(
+            [self._weighted_interval(length) for length in categorical.categories] + [1]
+        )
+        # Code -1 (missing) selects the last weight.
+        return pd.Series(table[categorical.codes], index=lengths.index)
+
+    def _numpy_analytics(self, output: OutputFormat, **kwargs: Any) -> Any:
+        """Analyze with the NumPy backend."""
+        if self._readings is None:
+            self._readings = Readings.from_records(
+                cast("Iterable[dict[str, Any]]", self._data)
+            )
+        columns = numpy_analytics.analyze(
+            self._readings, self._step_hour, self.local_timezone, **kwargs
+        )
+        tempo = kwargs.get("tempo")
+        categories = {
+            "notes": list(NOTES),
+            "tempo": tempo_categories(tempo) if tempo else [],
+        }
+        dates = columns["date"].astype("datetime64[s]")
+        if output == "columns":
+            labels = {
+                name: np.array([*categories[name], None], dtype=object)[columns[name]]
+                for name in categories
+                if name in columns
+            }
+            return {**columns, "date": dates, **labels}
+
+        tz = "UTC" if kwargs.get("convertUTC") else self.local_timezone
+        self.df = pd.DataFrame(
+            {
+                **columns,
+                "date": pd.DatetimeIndex(dates).tz_localize("UTC").tz_convert(tz),
+                **{
+                    name: pd.Categorical.from_codes(columns[name], categories[name])
+                    for name in categories
+                    if name in columns
+                },
+            }
+        )
+        if not kwargs.get("groupby"):
+            self.df.index = self.df.date
+        return format_output(self.df, output)
+
+    def memory_usage(self) -> int:
+        """Return the memory used by the frame, including labels."""
+        return int(self.df.memory_usage(deep=True).sum())
+
+    def _unit_prices(
+        self, prices: dict[str, Any], tempo: dict[str, str] | None
+    ) -> npt.NDArray[np.float64]:
+        """Return the unit price of each row.
+
+        Prices are laid out in a (notes x tempo colors) table, the last row
+        and column stand for unknown notes and unknown colors.
+        """
+        colors = TEMPO_COLORS if tempo else ()
+        table = price_table(prices, bool(tempo))
+        notes = _codes(self.df.notes, list(prices))
+        if colors and "tempo" in self.df:
+            days = _codes(self.df.tempo, TEMPO_COLORS)
+        else:
+            days = np.full(len(self.df), -1)
+        # Code -1 (unknown) selects the last row or column.
+        unit_prices: npt.NDArray[np.float64] = table[notes, days]
+        return unit_prices
+
+    def _cumsum(self, column: str, initial: dict[str, Any]) -> pd.Series:
+        """Return the cumulative sum of column by notes, from initial values."""
+        notes = pd.Categorical(self.df.notes)
+        offsets = np.array([initial.get(note, 0) for note in notes.categories])
+        return (
+            self.df.groupby("notes", observed=True, sort=False)[column].cumsum()
+            + offsets[notes.codes]
+        )
+
+    def _localize(self, dates: pd.Series) -> pd.Series:
+        """Parse dates to timezone-aware local timestamps.
+
+        Both Enedis formats ("%Y-%m-%d %H:%M:%S" and "%Y-%m-%d") are parsed
+        in one pass. When DST ends, the first occurrence of a repeated time
+        is summer time and the next one winter time; times skipped when DST
+        starts are shifted forward.
+        """
+        if not pd.api.types.is_datetime64_dtype(dates):
+            dates = pd.to_datetime(dates, format="ISO8601")
+        return dates.dt.tz_localize(
+            self.local_timezone,
+            ambiguous=~dates.duplicated(keep="first").to_numpy(),
+            nonexistent="shift_forward",
+        )
+
+    def _interval_start(self) -> pd.Series:
+        """Return the start of the interval of each reading.
+
+        Load curve readings are dated at the end of their interval, ex: the
+        reading of 01:00 (PT30M) belongs to the 00:30 - 01:00 interval, and
+        so to hour 0. Daily readings and grouped rows are dated at the start.
+        """
+        if "interval_length" not in self.df:
+            return self.df.date
+        return self.df.date - pd.to_timedelta(self.df.interval_length, unit="h")
 
     def _weighted_interval(self, interval: str) -> float | int:
         """Compute weighted."""
@@ -141,21 +409,166 @@ class EnedisAnalytics:
         return 1
 
     def _get_data_interval(self, intervals: list[tuple[str, str]]) -> pd.DataFrame:
-        """Group date from range time."""
-        for interval in intervals:
-            # Convert str to datetime
-            start = pd.to_datetime(interval[0], format="%H:%M:%S").time()
-            end = pd.to_datetime(interval[1], format="%H:%M:%S").time()
-            # Mark
-            self.df.loc[
-                (self.df.date.dt.time > start) & (self.df.date.dt.time <= end),
-                "notes",
-            ] = ATTR_OFFPEAK
-
+        """Mark offpeak readings from range time."""
+        mask = self.offpeak_mask(intervals)
+        minutes = (self.df.date.dt.hour * 60 + self.df.date.dt.minute).to_numpy()
+        codes = np.where(
+            mask[minutes], NOTES.index(ATTR_OFFPEAK), self.df.notes.cat.codes
+        )
+        self.df["notes"] = pd.Categorical.from_codes(codes, categories=NOTES)
         return self.df
 
+    @staticmethod
+    def offpeak_mask(intervals: list[tuple[str, str]]) -> npt.NDArray[np.bool_]:
+        """Return the offpeak mask of the 1440 minutes of a day.
+
+        Ranges are (start, end], in "%H:%M:%S" or "%H:%M" format, and may
+        cross midnight, ex: ("22:00:00", "06:00:00").
+        """
+        return offpeak_mask(intervals)
+
     def _set_tempo_days(self, tempo: dict[str, str]) -> pd.DataFrame:
-        """Add columns with tempo day."""
-        for str_date, value in tempo.items():
-            dt_date = pd.to_datetime(str_date, format="%Y-%m-%d")
-            self.df.loc[(self.df.date.dt.date == dt_date.date()), "tempo"] = value
+        """Add columns with tempo day (missing when unknown)."""
+        colors = pd.Series(tempo, dtype=object)
+        colors.index = pd.to_datetime(colors.index, format="%Y-%m-%d", errors="coerce")
+        colors = colors[colors.index.notna()]
+        days = self._interval_start().dt.tz_localize(None).dt.normalize()
+        self.df["tempo"] = pd.Categorical(
+            days.map(colors), categories=tempo_categories(tempo)
+        )
+        return self.df
+
+
+class EnedisIncrementalAnalytics:
+    """Grouped analytics updated with appended readings.
+
+    The aggregated rows (by notes and hour, or day for daily readings) are
+    kept with their running sum_value and sum_price. The raw readings of a
+    trailing window are kept too, so that late corrections inside the window
+    re-aggregate the buckets they touch. Readings older than the window are
+    ignored once rows have been aggregated.
+    """
+
+    def __init__(
+        self,
+        window: timedelta = timedelta(days=2),
+        convertKwh: bool = False,
+        intervals: list[tuple[str, str]] | None = None,
+        prices: dict[str, Any] | None = None,
+        tempo: dict[str, str] | None = None,
+        cum_value: dict[str, Any] | None = None,
+        cum_price: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize.
+
+        window: raw readings kept to handle late corrections
+        other parameters: see EnedisAnalytics.get_data_analytics
+        """
+        self.window = window
+        self.convertKwh = convertKwh
+        self.intervals = intervals
+        self.prices = prices
+        self.tempo = dict(tempo or {})
+        self.df = pd.DataFrame()
+        self.readings = Readings()
+        self._horizon: int | None = None
+        self._sum_value = pd.Series(cum_value or {}, dtype=np.float64)
+        self._sum_price = pd.Series(cum_price or {}, dtype=np.float64)
+
+    def append(
+        self,
+        data: Iterable[dict[str, Any]] | Readings,
+        tempo: dict[str, str] | None = None,
+        output: OutputFormat = "records",
+    ) -> Any:
+        """Add readings and return the new or changed aggregated rows.
+
+        data:  readings as returned by the API (list of dict) or Readings
+        tempo: tempo days to add
+        """
+        readings = data if isinstance(data, Readings) else Readings.from_records(data)
+        self.tempo.update(tempo or {})
+        bucket = 86400 if readings.daily else 3600
+        starts = readings.timestamps - readings.intervals.astype(np.int64) * 60
+        if self._horizon is not None:
+            late = starts // bucket * bucket < self._horizon
+            if late.any():
+                _LOGGER.warning(
+                    "Ignore %s readings older than the window", np.count_nonzero(late)
+                )
+                readings = readings[~late]
+                starts = starts[~late]
+        if len(readings) == 0:
+            return format_output(self.df.iloc[0:0], output)
+
+        # Buckets from the first one touched by the new readings are
+        # aggregated again from the raw readings of the window.
+        first = int(starts.min()) // bucket * bucket
+        merged = self.readings.merge(readings)
+        since = int(np.searchsorted(merged.timestamps, first))
+        rows = self._aggregate(merged[since:])
+        cut = self._wall_clock(first)
+        rows = rows[rows.date >= cut]
+
+        position = int(self.df.date.searchsorted(cut)) if len(self.df) else 0
+        previous = self.df.iloc[position:]
+        rows = self._add_sums(rows, previous)
+        self.df = pd.concat([self.df.iloc[:position], rows], ignore_index=True)
+
+        horizon = int(merged.timestamps.max() - self.window.total_seconds())
+        horizon = horizon // bucket * bucket
+        if self._horizon is None or horizon > self._horizon:
+            self._horizon = horizon
+        self.readings = merged[int(np.searchsorted(merged.timestamps, self._horizon)) :]
+        return format_output(self._changed(rows, previous), output)
+
+    def get(self, output: OutputFormat = "records") -> Any:
+        """Return all aggregated rows."""
+        return format_output(self.df, output)
+
+    def _aggregate(self, readings: Readings) -> pd.DataFrame:
+        """Aggregate readings, rows sorted by date and notes."""
+        rows: pd.DataFrame = EnedisAnalytics(readings).get_data_analytics(
+            convertKwh=self.convertKwh,
+            intervals=self.intervals,
+            groupby=True,
+            prices=self.prices,
+            tempo=self.tempo or None,
+            output="dataframe",
+        )
+        return rows.sort_values(["date", "notes"], kind="stable", ignore_index=True)
+
+    def _add_sums(self, rows: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+        """Add running sums to rows replacing the previous rows."""
+        rows = rows.copy()
+        labels = rows.notes.astype(str)
+        notes = rows.groupby(labels, sort=False)
+        for column, name in (("value", "_sum_value"), ("price", "_sum_price")):
+            if column not in rows:
+                continue
+            # Sums before the first row: totals less the replaced rows.
+            base: pd.Series = getattr(self, name)
+            if column in previous:
+                replaced = previous.groupby(previous.notes.astype(str))[column].sum()
+                base = base.sub(replaced, fill_value=0)
+            sums = notes[column].cumsum() + labels.map(base).fillna(0)
+            rows[f"sum_{column}"] = sums
+            setattr(self, name, sums.groupby(labels).last().combine_first(base))
+        return rows
+
+    @staticmethod
+    def _changed(rows: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+        """Return rows which are new or differ from the previous rows."""
+        if previous.empty:
+            return rows
+        keys = ["notes", "date"]
+        new = rows.set_index(keys)
+        old = previous.set_index(keys).reindex(index=new.index, columns=new.columns)
+        same = ((new == old) | (new.isna() & old.isna())).all(axis=1)
+        return rows[~same.to_numpy()]
+
+    def _wall_clock(self, timestamp: int) -> pd.Timestamp:
+        """Return the local timestamp of a wall-clock timestamp."""
+        return pd.Timestamp(timestamp, unit="s").tz_localize(
+            EnedisAnalytics.local_timezone, ambiguous=True, nonexistent="shift_forward"
+        )
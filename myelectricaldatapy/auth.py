@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterator, Callable
 import json
 import logging
 import socket
-from typing import Any
+import time
+from typing import Any, NoReturn
 
-from aiohttp import ClientError, ClientResponseError, ClientSession
+from aiohttp import ClientError, ClientResponse, ClientResponseError, ClientSession
 
 from .const import TIMEOUT, URL
 from .exceptions import (
@@ -17,53 +19,155 @@ from .exceptions import (
     LimitReached,
     TimeoutExceededError,
 )
+from .throttle import RetryPolicy, TokenBucket, get_bucket
 
 _LOGGER = logging.getLogger(__name__)
 
+try:
+    import orjson
+
+    JSON_LOADS: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    JSON_LOADS = json.loads
+
+RETRY_ERRORS = (LimitReached, HttpRequestError, TimeoutExceededError)
+
 
 class EnedisAuth:
     """Class for Enedis Auth API."""
 
     def __init__(
-        self, session: ClientSession, token: str, timeout: int = TIMEOUT
+        self,
+        session: ClientSession,
+        token: str,
+        timeout: int = TIMEOUT,
+        retry: RetryPolicy | None = None,
+        limiter: TokenBucket | None = None,
+        json_loads: Callable[[bytes], Any] | None = None,
     ) -> None:
-        """Init."""
+        """Init.
+
+        retry:      retry policy, see RetryPolicy
+        limiter:    rate limiter, shared by default between all requests
+                    made with the same token
+        json_loads: JSON decoder, orjson if installed else the standard library
+        """
         self.token = token
         self.timeout = timeout
         self.session = session
+        self.retry = retry or RetryPolicy()
+        self.limiter = limiter or get_bucket(token)
+        self.json_loads = json_loads or JSON_LOADS
 
     async def async_request(self, path: str, method: str = "get", **kwargs: Any) -> Any:
-        """Request session."""
-        kwargs.setdefault("headers", {})
-        kwargs["headers"].update(
-            {"Content-Type": "application/json", "Authorization": self.token}
-        )
+        """Request session.
+
+        Quota errors (409/429), timeouts and connection errors are retried
+        with exponential backoff until the retry policy limits are reached.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.async_acquire()
+            try:
+                result = await self._async_request(path, method, **kwargs)
+            except RETRY_ERRORS as error:
+                if isinstance(error, LimitReached):
+                    self.limiter.penalize()
+                delay = self.retry.delay(attempt)
+                if (
+                    attempt >= self.retry.max_attempts
+                    or time.monotonic() - started + delay > self.retry.max_elapsed
+                ):
+                    raise
+                _LOGGER.debug(
+                    "Retry %s in %.1fs (attempt %s): %s", path, delay, attempt, error
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.limiter.reward()
+                return result
+
+    async def async_stream(
+        self, path: str, method: str = "get", chunk_size: int = 65536, **kwargs: Any
+    ) -> AsyncIterator[bytes]:
+        """Request session, yield the body by chunks while it is received.
+
+        The timeout applies to the response and to each chunk. Errors are
+        raised as in async_request but are not retried, since chunks may
+        already have been consumed.
+        """
+        await self.limiter.async_acquire()
+        self._set_headers(kwargs)
+        try:
+            async with asyncio.timeout(self.timeout):
+                _LOGGER.debug("Stream: %s (%s) - %s", path, method, kwargs.get("json"))
+                response = await self.session.request(method, f"{URL}/{path}", **kwargs)
+                if response.status >= 400:
+                    self._raise_error(response, await response.read())
+            try:
+                while True:
+                    async with asyncio.timeout(self.timeout):
+                        chunk = await response.content.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                response.release()
+        except asyncio.TimeoutError as error:
+            raise TimeoutExceededError(
+                "Timeout occurred while connecting to MyElectricalData."
+            ) from error
+        except (ClientError, socket.gaierror) as error:
+            raise HttpRequestError(
+                "Error occurred while communicating with MyElectricalData."
+            ) from error
+        self.limiter.reward()
 
+    async def _async_request(self, path: str, method: str, **kwargs: Any) -> Any:
+        """Execute one request."""
+        self._set_headers(kwargs)
         try:
             async with asyncio.timeout(self.timeout):
                 _LOGGER.debug("Request: %s (%s) - %s", path, method, kwargs.get("json"))
                 response = await self.session.request(method, f"{URL}/{path}", **kwargs)
                 contents = await response.read()
                 response.raise_for_status()
-        except (asyncio.CancelledError, asyncio.TimeoutError) as error:
+        except asyncio.TimeoutError as error:
             raise TimeoutExceededError(
                 "Timeout occurred while connecting to MyElectricalData."
             ) from error
         except ClientResponseError:
-            message = contents.decode("utf8")
-            if "application/json" in response.headers.get("Content-Type", ""):
-                msg = json.loads(message)
-                if response.status == 409:
-                    raise LimitReached(msg.get("detail", msg))
-                raise EnedisException(msg.get("detail", msg))
-            raise EnedisException({"message": message})
+            self._raise_error(response, contents)
         except (ClientError, socket.gaierror) as error:
             raise HttpRequestError(
                 "Error occurred while communicating with MyElectricalData."
             ) from error
 
-        return (
-            await response.json()
-            if "application/json" in response.headers.get("Content-Type", "")
-            else await response.text()
+        # The body has been read once, decode it without reading it again.
+        if "application/json" in response.headers.get("Content-Type", ""):
+            # Empty body (ex: 204) as with response.json()
+            return self.json_loads(contents) if contents.strip() else None
+        return contents.decode(response.get_encoding())
+
+    def _set_headers(self, kwargs: dict[str, Any]) -> None:
+        """Add authorization headers."""
+        kwargs.setdefault("headers", {})
+        kwargs["headers"].update(
+            {"Content-Type": "application/json", "Authorization": self.token}
         )
+
+    def _raise_error(self, response: ClientResponse, contents: bytes) -> NoReturn:
+        """Raise the exception matching an error response."""
+        if "application/json" in response.headers.get("Content-Type", "") and (
+            contents.strip()
+        ):
+            msg = self.json_loads(contents)
+            if response.status in (409, 429):
+                raise LimitReached(msg.get("detail", msg))
+            raise EnedisException(msg.get("detail", msg))
+        message = contents.decode("utf8")
+        if response.status in (409, 429):
+            raise LimitReached({"message": message})
+        raise EnedisException({"message": message})
@@ -0,0 +1,126 @@
+"""Persistent response cache for MyElectricalData."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import closing
+from datetime import date, timedelta
+from functools import partial
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any
+
+from .const import CACHE_TTL, DAILY_CONSUM, DAILY_PROD, DETAIL_CONSUM, DETAIL_PROD
+from .tz import local_now
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_SERVICES = (
+    DAILY_CONSUM,
+    DAILY_PROD,
+    DETAIL_CONSUM,
+    DETAIL_PROD,
+    "daily_consumption_max_power",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    service TEXT NOT NULL,
+    pdl TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    immutable INTEGER NOT NULL,
+    PRIMARY KEY (service, pdl, start, end)
+)
+"""
+
+
+def _is_complete(service: str, end: str, payload: Any) -> bool:
+    """Return True if a response has readings up to the end of its window.
+
+    Load curve readings are dated at the end of their interval, so the last
+    one of the window is dated at end 00:00:00; other readings are dated on
+    the last day of the window.
+    """
+    readings = (payload or {}).get("meter_reading", {}).get("interval_reading", [])
+    if not readings:
+        return False
+    last = max(str(reading.get("date", "")) for reading in readings)
+    if service in (DETAIL_CONSUM, DETAIL_PROD):
+        return last >= f"{end} 00:00:00"
+    previous_day = date.fromisoformat(end) - timedelta(days=1)
+    return last[:10] >= previous_day.isoformat()
+
+
+class EnedisCache:
+    """Cache of responses, stored in a SQLite file.
+
+    Entries are keyed by (service, pdl, start, end). A window that was
+    already in the past when it was fetched, with all its readings, never
+    changes and is kept forever, other windows (including empty or partial
+    responses, not yet published by Enedis) are reused for `ttl` seconds.
+    The file can be shared between restarts and processes.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], ttl: float = CACHE_TTL) -> None:
+        """Initialize."""
+        self.path = os.fspath(path)
+        self.ttl = ttl
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(SCHEMA)
+
+    def get(self, service: str, pdl: str, start: str, end: str) -> Any | None:
+        """Return the cached response or None."""
+        with closing(sqlite3.connect(self.path)) as conn:
+            row = conn.execute(
+                "SELECT payload, fetched, immutable FROM responses"
+                " WHERE service=? AND pdl=? AND start=? AND end=?",
+                (service, pdl, start, end),
+            ).fetchone()
+        if row is None:
+            return None
+        payload, fetched, immutable = row
+        if not immutable and time.time() - fetched >= self.ttl:
+            return None
+        _LOGGER.debug("Cache hit: %s/%s (%s - %s)", service, pdl, start, end)
+        return json.loads(payload)
+
+    def set(self, service: str, pdl: str, start: str, end: str, payload: Any) -> None:
+        """Store a response.
+
+        The end date is excluded by the API and yesterday's readings are
+        published during the day, so only windows ending before today, with
+        readings up to their end, are considered immutable.
+        """
+        immutable = end < local_now().strftime("%Y-%m-%d") and _is_complete(
+            service, end, payload
+        )
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (service, pdl, start, end, json.dumps(payload), time.time(), immutable),
+            )
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute("DELETE FROM responses")
+
+    async def async_get(self, service: str, pdl: str, start: str, end: str) -> Any:
+        """Return the cached response or None, without blocking the loop."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.get, service, pdl, start, end)
+        )
+
+    async def async_set(
+        self, service: str, pdl: str, start: str, end: str, payload: Any
+    ) -> None:
+        """Store a response, without blocking the loop."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.set, service, pdl, start, end, payload)
+        )
@@ -1,7 +1,9 @@
 """Constants."""
 
+ATTR_BACKEND = "backend"
 ATTR_CUM_PRICE = "cum_price"
 ATTR_CUM_VALUE = "cum_value"
+ATTR_DOWNCAST = "downcast"
 ATTR_END = "end"
 ATTR_INTERVALS = "intervals"
 ATTR_OFFPEAK = "offpeak"
@@ -9,7 +11,9 @@ ATTR_PRICES = "prices"
 ATTR_SERVICE = "service"
 ATTR_STANDARD = "standard"
 ATTR_START = "start"
+ATTR_VERSION = "version"
 ATTR_FN = "function"
+ATTR_INCREMENTAL = "incremental"
 CONSUMPTION = "consumption"
 DAILY_CONSUM = "daily_consumption"
 DAILY_PROD = "daily_production"
@@ -18,3 +22,10 @@ DETAIL_PROD = "production_load_curve"
 PRODUCTION = "production"
 TIMEOUT = 30
 URL = "https://myelectricaldata.fr"
+RATE_BURST = 5
+RATE_LIMIT = 5
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 1
+RETRY_MAX_BACKOFF = 30
+RETRY_MAX_ELAPSED = 60
+CACHE_TTL = 3600
@@ -0,0 +1,197 @@
+"""Class for a fleet of PDL."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+import logging
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import ClientSession, TCPConnector
+
+from .cache import EnedisCache
+from .const import TIMEOUT
+from .exceptions import EnedisException
+from .mypdl import EnedisByPDL
+from .throttle import RetryPolicy
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+    from .analytics import OutputFormat
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EnedisFleet:
+    """Enedis fleet class.
+
+    This class manages many connection points on one pooled session.
+
+    The "add" function registers a connection point and its collects (the
+    parameters of EnedisByPDL.set_collects).
+    The "async_update" function refreshes every connection point, at most
+    max_concurrency at the same time, and returns the error of each one.
+    The "async_iter_stats" function computes their statistics in worker
+    processes.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession | None = None,
+        max_connections: int = 100,
+        max_concurrency: int = 10,
+        timeout: int = TIMEOUT,
+        retry: RetryPolicy | None = None,
+        cache: EnedisCache | None = None,
+    ) -> None:
+        """Initialize.
+
+        max_connections: size of the connection pool (ignored with a session)
+        max_concurrency: maximum number of connection points refreshed
+                         at the same time
+        """
+        self.session = session or ClientSession(
+            connector=TCPConnector(limit=max_connections)
+        )
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.retry = retry
+        self.cache = cache
+        self.pdls: dict[str, EnedisByPDL] = {}
+
+    def add(
+        self,
+        pdl: str,
+        token: str,
+        collects: list[dict[str, Any]] | None = None,
+        max_concurrency: int = 1,
+    ) -> EnedisByPDL:
+        """Register a connection point.
+
+        collects: parameters of EnedisByPDL.set_collects
+            ex: [{"service": "daily_consumption", "prices": {...}}]
+        max_concurrency: see Enedis
+        The connection point uses the fleet session, closed with the fleet.
+        """
+        mypdl = EnedisByPDL(
+            pdl,
+            token,
+            self.session,
+            self.timeout,
+            max_concurrency,
+            self.retry,
+            self.cache,
+        )
+        for collect in collects or []:
+            mypdl.set_collects(**collect)
+        self.pdls[pdl] = mypdl
+        return mypdl
+
+    def remove(self, pdl: str) -> None:
+        """Unregister a connection point.
+
+        The session is left open for the others: connection points share the
+        fleet session, so do not call their async_close, close the fleet.
+        """
+        self.pdls.pop(pdl, None)
+
+    async def async_update(
+        self, force_refresh: bool = False
+    ) -> dict[str, Exception | None]:
+        """Update all connection points.
+
+        Return the error raised by each connection point, None on success.
+        An error (API or unexpected, ex: malformed payload) does not stop the
+        update of the others.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _async_update(mypdl: EnedisByPDL) -> Exception | None:
+            async with semaphore:
+                try:
+                    await mypdl.async_update(force_refresh)
+                except EnedisException as error:
+                    _LOGGER.warning("%s: %s", mypdl.pdl, error)
+                    return error
+                except Exception as error:  # pylint: disable=broad-except
+                    _LOGGER.exception("%s: unexpected error", mypdl.pdl)
+                    return error
+                return None
+
+        pdls = list(self.pdls.values())
+        results = await asyncio.gather(*(_async_update(mypdl) for mypdl in pdls))
+        return {mypdl.pdl: result for mypdl, result in zip(pdls, results)}
+
+    async def async_iter_stats(
+        self,
+        output: OutputFormat = "records",
+        max_workers: int | None = None,
+        executor: Executor | None = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any] | Exception]]:
+        """Compute statistics of all connection points in worker processes.
+
+        Yield (pdl, statistics) as each connection point is computed, see
+        EnedisByPDL.get_stats, or (pdl, error) when its analytics raised: an
+        error does not stop the others. Readings are sent to the workers as
+        NumPy arrays. Statistics are cached in EnedisByPDL.
+
+        max_workers: number of processes (default: number of CPUs)
+        executor: executor to use instead of a new process pool
+
+        Stopping the iteration early (break, aclose) cancels the computations
+        not started yet.
+        """
+        from .analytics import analyze  # pylint: disable=import-outside-toplevel
+
+        if output == "iter":
+            raise ValueError("The iter output can not be sent by worker processes")
+        loop = asyncio.get_running_loop()
+        pool = executor or ProcessPoolExecutor(max_workers)
+
+        async def _async_stats(
+            mypdl: EnedisByPDL,
+        ) -> tuple[str, dict[str, Any] | Exception]:
+            stats, jobs = mypdl._stats_jobs(output)  # pylint: disable=protected-access
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(pool, analyze, data, params)
+                    for _, data, params in jobs.values()
+                ),
+                return_exceptions=True,
+            )
+            error: Exception | None = None
+            for (mode, (key, _, _)), resultat in zip(jobs.items(), results):
+                if isinstance(resultat, Exception):
+                    _LOGGER.error("%s: statistics of %s: %s", mypdl.pdl, mode, resultat)
+                    error = error or resultat
+                    continue
+                stats[mode] = mypdl._store_stats(mode, output, key, resultat)  # pylint: disable=protected-access
+            return mypdl.pdl, error or stats
+
+        tasks = [
+            asyncio.ensure_future(_async_stats(mypdl)) for mypdl in self.pdls.values()
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # Iteration stopped early: drop the computations left.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if executor is None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> Self:
+        """Asynchronous enter."""
+        return self
+
+    async def __aexit__(self, *_exc_info: object) -> None:
+        """Async exit."""
+        await self.async_close()
+
+    async def async_close(self) -> None:
+        """Close the session."""
+        await self.session.close()
@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
-from collections.abc import Generator
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Generator
 from datetime import date, datetime as dt, timedelta
 import logging
 import re
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING, Any
 
 from aiohttp import ClientSession
 
 from .auth import EnedisAuth
+from .cache import CACHE_SERVICES, EnedisCache
 from .const import DAILY_CONSUM, DAILY_PROD, DETAIL_CONSUM, DETAIL_PROD, TIMEOUT
 from .exceptions import EnedisException
+from .stream import IntervalReadingParser
+from .throttle import RetryPolicy
 from .tz import LOCAL_TIMEZONE, as_local, local_now
 
 if TYPE_CHECKING:
@@ -25,12 +29,28 @@ class Enedis:
     """Get data of pdl."""
 
     def __init__(
-        self, token: str, session: ClientSession | None = None, timeout: int = TIMEOUT
+        self,
+        token: str,
+        session: ClientSession | None = None,
+        timeout: int = TIMEOUT,
+        max_concurrency: int = 1,
+        retry: RetryPolicy | None = None,
+        cache: EnedisCache | None = None,
     ) -> None:
-        """Initialize."""
+        """Initialize.
+
+        max_concurrency: maximum number of load curve chunks (7 days each)
+                         requested at the same time.
+        retry: retry policy for failed requests (see RetryPolicy), quota
+               errors (409/429) included
+        cache: persistent cache for readings (see EnedisCache)
+        """
         session = session or ClientSession()
-        self.auth = EnedisAuth(session, token, timeout)
+        self.auth = EnedisAuth(session, token, timeout, retry)
         self.async_request = self.auth.async_request
+        self.cache = cache
+        self.max_concurrency = max(1, max_concurrency)
+        self._inflight: dict[tuple[str, ...], asyncio.Future[Any]] = {}
         self.offpeaks: list[str] = []
         self.last_access: date | None = None
 
@@ -45,13 +65,32 @@ class Enedis:
                     consumption_load_curve, production_load_curve
         """
         self.last_access = local_now()
-        path_range = ""
-        if start and end:
-            start_date = start.strftime("%Y-%m-%d")
-            end_date = end.strftime("%Y-%m-%d")
-            path_range = f"/start/{start_date}/end/{end_date}"
-        path = f"{service}/{pdl}{path_range}"
-        return await self.async_request(path=path)
+        if not (start and end):
+            return await self._async_single_flight(
+                ("fetch", service, pdl),
+                lambda: self.async_request(path=f"{service}/{pdl}"),
+            )
+
+        start_date = start.strftime("%Y-%m-%d")
+        end_date = end.strftime("%Y-%m-%d")
+        return await self._async_single_flight(
+            ("fetch", service, pdl, start_date, end_date),
+            lambda: self._async_fetch_range(service, pdl, start_date, end_date),
+        )
+
+    async def _async_fetch_range(
+        self, service: str, pdl: str, start_date: str, end_date: str
+    ) -> Any:
+        """Retrieve data from service over a date range, through the cache."""
+        path = f"{service}/{pdl}/start/{start_date}/end/{end_date}"
+        if self.cache is None or service not in CACHE_SERVICES:
+            return await self.async_request(path=path)
+
+        key = (service, pdl, start_date, end_date)
+        if (response := await self.cache.async_get(*key)) is None:
+            response = await self.async_request(path=path)
+            await self.cache.async_set(*key, response)
+        return response
 
     async def async_valid_access(self, pdl: str) -> Any:
         """Return valid access."""
@@ -64,6 +103,12 @@ class Enedis:
 
     async def async_get_contract(self, pdl: str) -> Any:
         """Return contract information."""
+        return await self._async_single_flight(
+            ("contract", pdl), lambda: self._async_get_contract(pdl)
+        )
+
+    async def _async_get_contract(self, pdl: str) -> Any:
+        """Fetch contract information and offpeak hours."""
         contract = {}
         contracts = await self.async_fetch_datas("contracts", pdl)
         usage_points = contracts.get("customer", {}).get("usage_points", "")
@@ -104,7 +149,10 @@ class Enedis:
             if end
             else (local_now() + timedelta(days=1)).strftime("%Y-%m-%d")
         )
-        return await self.auth.async_request(path=f"rte/tempo/{str_start}/{str_end}")
+        return await self._async_single_flight(
+            ("tempo", str_start, str_end),
+            lambda: self.auth.async_request(path=f"rte/tempo/{str_start}/{str_end}"),
+        )
 
     async def async_get_ecowatt(
         self, start: dt | None = None, end: dt | None = None
@@ -145,6 +193,11 @@ class Enedis:
                 )
                 if starting < start_time <= ending:
                     return True
+                # Range crossing midnight, ex: 22H00-6H00
+                if starting > ending and (
+                    start_time > starting or start_time <= ending
+                ):
+                    return True
         return False
 
     async def async_get_identity(self, pdl: str) -> Any:
@@ -174,29 +227,108 @@ class Enedis:
         )
 
     async def _async_get_details(self, mode: str, pdl: str, start: dt, end: dt) -> Any:
-        """Get production details. (max: 7 days)."""
-        data = None
-        response = {}
+        """Get production details. (max: 7 days).
+
+        Chunks are requested concurrently (up to max_concurrency) and
+        readings are returned in chronological order. After the first error,
+        chunks not yet requested are skipped and only the readings preceding
+        the failed chunk are returned.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
         raise_error = False
-        for interval in list(self.date_range(start, end, 7)):
-            start, end = interval
-            try:
-                if raise_error is False:
-                    response = await self.async_fetch_datas(mode, pdl, start, end)
-            except EnedisException as error:
-                raise_error = True
-                _LOGGER.error(error)
 
+        async def _async_fetch_chunk(chunk_start: dt, chunk_end: dt) -> Any:
+            nonlocal raise_error
+            async with semaphore:
+                if raise_error:
+                    return None
+                try:
+                    return await self.async_fetch_datas(
+                        mode, pdl, chunk_start, chunk_end
+                    )
+                except EnedisException as error:
+                    raise_error = True
+                    _LOGGER.error(error)
+                    return None
+
+        responses = await asyncio.gather(
+            *(
+                _async_fetch_chunk(chunk_start, chunk_end)
+                for chunk_start, chunk_end in self.date_range(start, end, 7)
+            )
+        )
+
+        # Responses may be shared with other callers, build a new payload.
+        data: dict[str, Any] | None = None
+        readings: list[Any] = []
+        for response in responses:
+            if response is None:
+                break
             new_data = response.get("meter_reading", {}).get("interval_reading")
-            if response is None or new_data is None:
+            if new_data is None:
                 continue
             elif data is None:
-                data = cast(dict[str, Any], response)
-            else:
-                data["meter_reading"]["interval_reading"].extend(new_data)
+                meter_reading = {
+                    **response["meter_reading"],
+                    "interval_reading": readings,
+                }
+                data = {**response, "meter_reading": meter_reading}
+            readings.extend(new_data)
 
         return data
 
+    async def async_iter_details(
+        self, mode: str, pdl: str, start: dt, end: dt, batch_size: int = 0
+    ) -> AsyncIterator[Any]:
+        """Yield readings of a load curve while they are received.
+
+        mode: consumption_load_curve or production_load_curve
+        batch_size: if set, yield lists of batch_size readings (the last one
+                    may be shorter) instead of readings one by one.
+
+        Chunks of 7 days are requested one after the other and readings are
+        parsed while the body arrives, so memory does not grow with the
+        length of the range. Responses are neither cached nor retried.
+        """
+        self.last_access = local_now()
+        batch: list[Any] = []
+        for chunk_start, chunk_end in self.date_range(start, end, 7):
+            start_date = chunk_start.strftime("%Y-%m-%d")
+            end_date = chunk_end.strftime("%Y-%m-%d")
+            parser = IntervalReadingParser()
+            async for body in self.auth.async_stream(
+                path=f"{mode}/{pdl}/start/{start_date}/end/{end_date}"
+            ):
+                for reading in parser.feed(body):
+                    if not batch_size:
+                        yield reading
+                        continue
+                    batch.append(reading)
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+            parser.close()
+        if batch:
+            yield batch
+
+    async def _async_single_flight(
+        self, key: tuple[str, ...], request: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Share one in-flight request between identical concurrent calls.
+
+        The result, or the error, is returned to every waiter. A waiter being
+        cancelled does not cancel the request for the others.
+        """
+        if (future := self._inflight.get(key)) is None:
+            future = self._inflight[key] = asyncio.ensure_future(request())
+
+            def _release(done: asyncio.Future[Any]) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            future.add_done_callback(_release)
+        return await asyncio.shield(future)
+
     @staticmethod
     def date_range(start: dt, end: dt, intv: int) -> Generator[tuple[dt, dt], dt, None]:
         """Return range by interval date."""
@@ -2,28 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
 from collections.abc import Callable
 from datetime import date, datetime as dt, timedelta
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from aiohttp import ClientSession
-import voluptuous as vol
 
-from myelectricaldatapy import Enedis, EnedisException, LimitReached
-
-from .analytics import EnedisAnalytics
+from .cache import EnedisCache
 from .const import (
+    ATTR_BACKEND,
     ATTR_CUM_PRICE,
     ATTR_CUM_VALUE,
+    ATTR_DOWNCAST,
     ATTR_END,
     ATTR_FN,
+    ATTR_INCREMENTAL,
     ATTR_INTERVALS,
-    ATTR_OFFPEAK,
     ATTR_PRICES,
     ATTR_SERVICE,
-    ATTR_STANDARD,
     ATTR_START,
+    ATTR_VERSION,
     CONSUMPTION,
     DAILY_CONSUM,
     DAILY_PROD,
@@ -32,57 +32,30 @@ from .const import (
     PRODUCTION,
     TIMEOUT,
 )
-from .tz import as_local, local_now
+from .exceptions import EnedisException, LimitReached
+from .myelectricaldata import Enedis
+from .readings import Readings
+from .throttle import RetryPolicy
+from .tz import as_local, as_wall_clock, local_now
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from .analytics import Backend, OutputFormat
+    from .rollup import Rollups
 
 _LOGGER = logging.getLogger(__name__)
 
-MODES_SCH = vol.Schema(
-    {
-        vol.Optional(CONSUMPTION): {
-            vol.Required(ATTR_SERVICE): str,
-            vol.Optional(ATTR_START): dt,
-            vol.Optional(ATTR_END): dt,
-        },
-        vol.Optional(PRODUCTION): {
-            vol.Required(ATTR_SERVICE): str,
-            vol.Optional(ATTR_START): dt,
-            vol.Optional(ATTR_END): dt,
-        },
-    }
-)
+SCHEMAS = ("MODES_SCH", "PRICE_SCH", "PRICE_TEMPO_SCH", "CUM_SCH")
 
-PRICE_SCH = vol.Schema(
-    {
-        vol.Required(ATTR_STANDARD): {
-            vol.Required("price"): vol.Any(int, float),
-        },
-        vol.Optional(ATTR_OFFPEAK): {
-            vol.Required("price"): vol.Any(int, float),
-        },
-    }
-)
 
-PRICE_TEMPO_SCH = vol.Schema(
-    {
-        vol.Required(ATTR_STANDARD): {
-            vol.Required("blue"): vol.Any(int, float),
-            vol.Required("white"): vol.Any(int, float),
-            vol.Required("red"): vol.Any(int, float),
-        },
-        vol.Optional(ATTR_OFFPEAK): {
-            vol.Required("blue"): vol.Any(int, float),
-            vol.Required("white"): vol.Any(int, float),
-            vol.Required("red"): vol.Any(int, float),
-        },
-    }
-)
+def __getattr__(name: str) -> Any:
+    """Load schemas on first use (voluptuous is imported with them)."""
+    if name in SCHEMAS:
+        from . import schemas  # pylint: disable=import-outside-toplevel
 
-CUM_SCH = vol.Schema(
-    {
-        vol.Required(ATTR_STANDARD): vol.Any(int, float),
-        vol.Optional(ATTR_OFFPEAK): vol.Any(int, float),
-    }
-)
+        return getattr(schemas, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class EnedisByPDL:
@@ -92,7 +65,8 @@ class EnedisByPDL:
 
     The "set_collect" function allows you to specify the collection parameters from Enedis
     The "async_update_collects" function allows you to perform the calculations
-    The result is displayed in the property: stats
+    The result is displayed in the property: stats (or returned by
+    async_stats, which does not block the event loop)
     y"""
 
     def __init__(
@@ -101,17 +75,28 @@ class EnedisByPDL:
         token: str,
         session: ClientSession | None = None,
         timeout: int = TIMEOUT,
+        max_concurrency: int = 1,
+        retry: RetryPolicy | None = None,
+        cache: EnedisCache | None = None,
     ) -> None:
         """Initialize."""
         session = ClientSession() if session is None else session
-        self._api: Enedis = Enedis(token, session, timeout)
+        self._api: Enedis = Enedis(
+            token, session, timeout, max_concurrency, retry, cache
+        )
         self.pdl = pdl
         self._connected: bool = False
         self._ecowatt_subs: bool = False
         self._maxpower_subs: bool = False
         self._off_subs: bool = False
         self._params: dict[str, dict[str, Any]] = {}
+        self._rollups: dict[str, tuple[tuple[int, int], Rollups]] = {}
+        self._stats: dict[tuple[str, str], tuple[tuple[int, int], Any]] = {}
+        self._stats_inflight: dict[tuple[Any, ...], asyncio.Future[Any]] = {}
+        self._tempo: dict[str, Any] = {}
         self._tempo_subs: bool = False
+        self._tempo_version: int = 0
+        self._version: int = 0
         self.access: dict[str, Any] = {}
         self.address: dict[str, Any] = {}
         self.contract: dict[str, Any] = {}
@@ -122,7 +107,6 @@ class EnedisByPDL:
         self.last_access: dt = local_now()
         self.last_refresh: date | None = None
         self.max_power: dict[str, Any] = {}
-        self.tempo: dict[str, Any] = {}
 
     @property
     def is_connected(self) -> bool:
@@ -156,27 +140,241 @@ class EnedisByPDL:
         """Offpeak hours prices."""
         return self._params[CONSUMPTION].get(ATTR_PRICES)
 
+    @property
+    def tempo(self) -> dict[str, Any]:
+        """Tempo days."""
+        return self._tempo
+
+    @tempo.setter
+    def tempo(self, tempo: dict[str, Any]) -> None:
+        """Set tempo days."""
+        if tempo != self._tempo:
+            self._tempo_version = self._next_version()
+        self._tempo = tempo
+
     @property
     def stats(self) -> dict[str, Any]:
         """Statistics."""
+        return self.get_stats()
+
+    def get_stats(self, output: OutputFormat = "records") -> dict[str, Any]:
+        """Statistics by mode, see EnedisAnalytics.get_data_analytics for output.
+
+        Results are computed once and reused until the readings, the collect
+        parameters or the tempo days change (except for the iter output).
+        They are shared between calls and must not be modified.
+        """
+        from .analytics import analyze  # pylint: disable=import-outside-toplevel
+
+        stats, jobs = self._stats_jobs(output)
+        for mode, (key, data, params) in jobs.items():
+            stats[mode] = self._store_stats(mode, output, key, analyze(data, params))
+        return stats
+
+    async def async_stats(
+        self, output: OutputFormat = "records", executor: Executor | None = None
+    ) -> dict[str, Any]:
+        """Statistics by mode, computed without blocking the event loop.
+
+        See get_stats. Analytics run in the executor (default: the one of
+        the event loop). Concurrent calls for the same readings share one
+        computation (except for the iter output).
+        """
+        from .analytics import analyze  # pylint: disable=import-outside-toplevel
+
+        stats, jobs = self._stats_jobs(output)
+        if not jobs:
+            return stats
+        loop = asyncio.get_running_loop()
+
+        async def _async_compute() -> dict[str, Any]:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, analyze, data, params)
+                    for _, data, params in jobs.values()
+                )
+            )
+            return {
+                mode: self._store_stats(mode, output, key, resultat)
+                for (mode, (key, _, _)), resultat in zip(jobs.items(), results)
+            }
+
+        if output == "iter":
+            return {**stats, **await _async_compute()}
+        key = (output, *((mode, *job[0]) for mode, job in jobs.items()))
+        if (future := self._stats_inflight.get(key)) is None:
+            future = self._stats_inflight[key] = asyncio.ensure_future(_async_compute())
+
+            def _release(done: asyncio.Future[dict[str, Any]]) -> None:
+                if self._stats_inflight.get(key) is done:
+                    del self._stats_inflight[key]
+
+            future.add_done_callback(_release)
+        return {**stats, **await asyncio.shield(future)}
+
+    def _stats_jobs(
+        self, output: OutputFormat
+    ) -> tuple[
+        dict[str, Any], dict[str, tuple[tuple[int, int], Readings, dict[str, Any]]]
+    ]:
+        """Return the statistics cached and the analytics to run for the others.
+
+        Analytics are (cache key, readings, get_data_analytics parameters).
+        """
         stats = {}
+        jobs = {}
         for mode, params in self._params.items():
-            data = params.get("data", {})
-            analytics = EnedisAnalytics(data)
-            resultat = analytics.get_data_analytics(
-                convertKwh=True,
-                convertUTC=False,
+            key = (params[ATTR_VERSION], self._tempo_version)
+            cached_key, resultat = self._stats.get((mode, output), (None, None))
+            if cached_key == key:
+                stats[mode] = resultat
+                continue
+            jobs[mode] = (
+                key,
+                params.get("data", Readings()),
+                {
+                    "convertKwh": True,
+                    "convertUTC": False,
+                    "intervals": params.get(ATTR_INTERVALS, []),
+                    "groupby": True,
+                    "summary": True,
+                    "prices": params.get(ATTR_PRICES, {}),
+                    "cum_value": params.get(ATTR_CUM_VALUE, {}),
+                    "cum_price": params.get(ATTR_CUM_PRICE, {}),
+                    "start_date": params.get(ATTR_START),
+                    "tempo": self.tempo,
+                    "output": output,
+                    "downcast": params.get(ATTR_DOWNCAST, False),
+                    "backend": params.get(ATTR_BACKEND, "pandas"),
+                },
+            )
+        return stats, jobs
+
+    def _store_stats(
+        self, mode: str, output: OutputFormat, key: tuple[int, int], resultat: Any
+    ) -> Any:
+        """Cache statistics computed for a key (except for the iter output)."""
+        if output != "iter":
+            self._stats[(mode, output)] = (key, resultat)
+        return resultat
+
+    def invalidate_stats(self) -> None:
+        """Discard statistics computed, ex: after changing tempo in place."""
+        self._stats.clear()
+        self._rollups.clear()
+
+    def get_rollups(self, mode: str) -> Rollups:
+        """Hourly, daily, monthly and yearly totals by notes and tempo color.
+
+        mode: "consumption" or "production"
+        Rollups are computed once, then updated from the first change when
+        readings are collected incrementally or tempo days are added.
+        """
+        from .rollup import Rollups  # pylint: disable=import-outside-toplevel
+
+        params = self._params[mode]
+        key = (params[ATTR_VERSION], self._tempo_version)
+        cached_key, rollups = self._rollups.get(mode, (None, None))
+        if cached_key != key or rollups is None:
+            rollups = Rollups(
                 intervals=params.get(ATTR_INTERVALS, []),
-                groupby=True,
-                summary=True,
                 prices=params.get(ATTR_PRICES, {}),
-                cum_value=params.get(ATTR_CUM_VALUE, {}),
-                cum_price=params.get(ATTR_CUM_PRICE, {}),
-                start_date=params.get(ATTR_START),
-                tempo=self.tempo,
             )
-            stats.update({mode: resultat})
-        return stats
+            rollups.update(params.get("data", Readings()), self.tempo)
+            self._rollups[mode] = (key, rollups)
+        return rollups
+
+    def query(
+        self,
+        mode: str,
+        start: dt | None = None,
+        end: dt | None = None,
+        freq: str | None = None,
+        output: OutputFormat = "records",
+    ) -> Any:
+        """Readings or totals of the intervals in [start, end).
+
+        mode:   "consumption" or "production"
+        freq:   None for the readings as collected (date, value in Wh and
+                interval_length in minutes for load curves), else
+                "hour", "day", "month" or "year" for totals by notes and
+                tempo color (see get_rollups)
+        output: see EnedisAnalytics.get_data_analytics
+
+        Only the rows in the range are read, found by binary search.
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        from .analytics import format_output  # pylint: disable=import-outside-toplevel
+        from .rollup import RESOLUTIONS  # pylint: disable=import-outside-toplevel
+
+        if freq is not None:
+            if freq not in RESOLUTIONS:
+                raise ValueError(f"Unknown frequency: {freq}")
+            return self.get_rollups(mode).buckets(
+                freq,
+                as_wall_clock(start) if start else None,
+                as_wall_clock(end) if end else None,
+                output,
+            )
+        readings = self._params[mode].get("data", Readings()).between(start, end)
+        rows = pd.DataFrame(
+            {
+                "date": readings.timestamps.astype("datetime64[s]"),
+                "value": readings.values,
+            }
+        )
+        if not readings.daily:
+            rows["interval_length"] = readings.intervals
+        return format_output(rows, output)
+
+    def _update_rollups(
+        self,
+        keys: dict[str, tuple[int, int]],
+        changes: dict[str, dt | None],
+        tempo: dict[str, Any],
+    ) -> None:
+        """Update rollups after a collect.
+
+        keys:    versions of the rollups before the collect
+        changes: start of the first new reading by mode, None if replaced
+        tempo:   tempo days before the collect
+        """
+        days = []
+        for day in {*tempo, *self.tempo}:
+            if tempo.get(day) == self.tempo.get(day):
+                continue
+            try:
+                days.append(dt.strptime(day, "%Y-%m-%d"))
+            except ValueError:
+                # Not a date, ignored by the analytics too.
+                continue
+        for mode, (key, rollups) in list(self._rollups.items()):
+            params = self._params[mode]
+            version = (params[ATTR_VERSION], self._tempo_version)
+            if key == version:
+                continue
+            if key != keys.get(mode):
+                # Parameters changed outside the collect: full rebuild, when
+                # requested.
+                del self._rollups[mode]
+                continue
+            if mode in changes and changes[mode] is None:
+                # Readings replaced: full rebuild, when requested.
+                del self._rollups[mode]
+                continue
+            # Rebuild since the first new reading or changed tempo day.
+            since = [*days]
+            if (start := changes.get(mode)) is not None:
+                since.append(start)
+            if since:
+                rollups.update(params.get("data", Readings()), self.tempo, min(since))
+            self._rollups[mode] = (version, rollups)
+
+    def _next_version(self) -> int:
+        """Return a new version number for data and parameters."""
+        self._version += 1
+        return self._version
 
     async def async_update(self, force_refresh: bool = False) -> None:
         """Update data."""
@@ -262,6 +460,10 @@ class EnedisByPDL:
             "offpeak":{"blue":[float],"white":[float],"red":[float]}
         }
         """
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        from .schemas import PRICE_SCH, PRICE_TEMPO_SCH  # pylint: disable=import-outside-toplevel
+
         try:
             validate = PRICE_SCH(prices)
         except vol.Error:
@@ -283,6 +485,10 @@ class EnedisByPDL:
         format: "value" or "price"
         cum_sum = {"standard":[float], "offpeak":[float]}
         """
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        from .schemas import CUM_SCH  # pylint: disable=import-outside-toplevel
+
         try:
             validate = CUM_SCH(cum_sum)
         except vol.Error as error:
@@ -299,6 +505,9 @@ class EnedisByPDL:
         prices: dict[str, Any] | None = None,
         cum_value: dict[str, Any] | None = None,
         cum_price: dict[str, Any] | None = None,
+        incremental: bool = False,
+        downcast: bool = False,
+        backend: Backend = "pandas",
     ) -> None:
         """Set parameters for data collect.
 
@@ -318,6 +527,11 @@ class EnedisByPDL:
             ex: {"standard":[float], "offpeak":[float]}
         cum_price:
             ex: {"standard":[float], "offpeak":[float]}
+        incremental: after the first collect, only request readings since the
+            last one collected and merge them into the stored readings.
+            Without end, the collect window follows the current date.
+        downcast: statistics values and prices as float32
+        backend: "pandas" or "numpy", see EnedisAnalytics.get_data_analytics
         """
         funcs: dict[str, Callable[..., Any]] = {
             DAILY_PROD: self._api.async_get_daily_production,
@@ -330,7 +544,19 @@ class EnedisByPDL:
         func = funcs[service]
         dt_start = as_local(start) if start else local_now() - timedelta(days=days)
         dt_end = as_local(end) if end else local_now() + timedelta(days=1)
-        self._params[mode] = {ATTR_FN: func, ATTR_START: dt_start, ATTR_END: dt_end}
+        previous = self._params.get(mode, {})
+        self._params[mode] = {
+            ATTR_FN: func,
+            ATTR_SERVICE: service,
+            ATTR_START: dt_start,
+            ATTR_END: None if incremental and end is None else dt_end,
+            ATTR_INCREMENTAL: incremental,
+            ATTR_DOWNCAST: downcast,
+            ATTR_BACKEND: backend,
+            ATTR_VERSION: self._next_version(),
+        }
+        if incremental and previous.get(ATTR_SERVICE) == service:
+            self._params[mode].update({"data": previous.get("data", Readings())})
         if intervals:
             self._set_intervals(mode, intervals)
         if prices:
@@ -349,28 +575,54 @@ class EnedisByPDL:
         """
         checked = True
         self.has_collected = False
+        keys = {
+            mode: (attr[ATTR_VERSION], self._tempo_version)
+            for mode, attr in self._params.items()
+        }
+        changes: dict[str, dt | None] = {}
+        previous_tempo = self.tempo
         for mode, attr in self._params.items():
             dataset = {}
             start = attr[ATTR_START]
-            end = attr[ATTR_END]
+            end = attr[ATTR_END] or local_now() + timedelta(days=1)
             fn = attr[ATTR_FN]
+            previous = Readings()
+            if attr[ATTR_INCREMENTAL]:
+                previous = attr.get("data", previous)
+            if last := previous.last:
+                # Request again the day of the last reading, to get corrections.
+                last = last.replace(hour=0, minute=0, second=0)
+                start = max(start, as_local(last))
             try:
-                dataset = await fn(self.pdl, start, end)
+                if start < end:
+                    dataset = await fn(self.pdl, start, end)
             except EnedisException as error:
                 checked = False
                 _LOGGER.error(error)
             else:
-                if dataset is None:
+                if dataset is None and not previous:
                     raise EnedisException("Data collection is empty")
-                data = dataset.get("meter_reading", {}).get("interval_reading", [])
-                if len(data) == 0:
+                data = (
+                    (dataset or {}).get("meter_reading", {}).get("interval_reading", [])
+                )
+                if len(data) == 0 and not previous:
                     raise EnedisException("Data collection is empty")
+                data = Readings.from_records(data)
+                since = data.start if previous else None
+                if previous:
+                    data = previous.merge(data)
                 checked = checked and len(data) > 0
-                self._params[mode].update({"data": data})
+                if attr.get("data") != data:
+                    self._params[mode].update(
+                        {"data": data, ATTR_VERSION: self._next_version()}
+                    )
+                    changes[mode] = since
 
             if mode == CONSUMPTION and self._tempo_subs:
-                self.tempo = await self._api.async_get_tempo(start, end)
+                tempo = await self._api.async_get_tempo(start, end)
+                self.tempo = {**self.tempo, **tempo} if previous else tempo
 
+        self._update_rollups(keys, changes, previous_tempo)
         self.has_collected = checked
 
     async def __aexit__(self, *_exc_info: object) -> None:
@@ -378,6 +630,9 @@ class EnedisByPDL:
         await self.async_close()
 
     async def async_close(self) -> None:
-        """Close the session."""
+        """Close the session.
+
+        In an EnedisFleet the session is shared: close the fleet instead.
+        """
         if self._api.auth.session:
             await self._api.auth.session.close()
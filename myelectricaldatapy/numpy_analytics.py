@@ -0,0 +1,313 @@
+"""Analytics on NumPy arrays.
+
+Same pipeline as EnedisAnalytics (backend "pandas") on the columns of
+Readings: localize, weight, mark offpeak, tag tempo, group by hour or day,
+price and cumulate. Dates are handled as int64 seconds since epoch.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime as dt, timedelta, timezone, tzinfo
+from functools import partial
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from .const import ATTR_OFFPEAK, ATTR_STANDARD
+from .readings import Readings
+
+MINUTES_PER_DAY = 1440
+SECONDS_PER_DAY = 86400
+NOTES = (ATTR_OFFPEAK, ATTR_STANDARD)
+TEMPO_COLORS = ("blue", "white", "red")
+EPOCH = dt(1970, 1, 1)
+
+Columns = dict[str, npt.NDArray[Any]]
+
+
+def _minute_of_day(time: str) -> int:
+    """Convert a time ("%H:%M:%S" or "%H:%M") to a minute of the day."""
+    hours, minutes = time.split(":")[:2]
+    return (int(hours) * 60 + int(minutes)) % MINUTES_PER_DAY
+
+
+def offpeak_mask(intervals: list[tuple[str, str]]) -> npt.NDArray[np.bool_]:
+    """Return the offpeak mask of the 1440 minutes of a day.
+
+    Ranges are (start, end], in "%H:%M:%S" or "%H:%M" format, and may
+    cross midnight, ex: ("22:00:00", "06:00:00").
+    """
+    minutes = np.arange(MINUTES_PER_DAY)
+    mask = np.zeros(MINUTES_PER_DAY, dtype=bool)
+    for interval in intervals:
+        start, end = (_minute_of_day(time) for time in interval)
+        if start <= end:
+            mask |= (minutes > start) & (minutes <= end)
+        else:
+            mask |= (minutes > start) | (minutes <= end)
+    return mask
+
+
+def price_table(prices: dict[str, Any], tempo: bool) -> npt.NDArray[np.float64]:
+    """Return unit prices in a (notes x tempo colors) table.
+
+    Rows follow the notes of prices, columns TEMPO_COLORS. The last row and
+    column stand for unknown notes and unknown colors.
+    """
+    colors = TEMPO_COLORS if tempo else ()
+    table = np.full((len(prices) + 1, len(TEMPO_COLORS) + 1), np.nan)
+    for row, values in enumerate(prices.values()):
+        if not isinstance(values, dict):
+            continue
+        for offset, price in values.items():
+            if offset in colors:
+                table[row, TEMPO_COLORS.index(offset)] = price
+            elif offset == "price":
+                table[row, :] = price
+            else:
+                table[row, :] = np.nan
+    return table
+
+
+def tempo_categories(tempo: dict[str, str]) -> list[str]:
+    """Return the tempo colors, known ones first."""
+    return [*TEMPO_COLORS, *sorted(set(tempo.values()) - set(TEMPO_COLORS))]
+
+
+def _offset(tz: tzinfo, wall: int, fold: int = 0) -> int:
+    """Return the UTC offset of a wall-clock time in seconds."""
+    date = (EPOCH + timedelta(seconds=wall)).replace(tzinfo=tz, fold=fold)
+    return int(date.utcoffset().total_seconds())  # type: ignore[union-attr]
+
+
+def _utc_offset(tz: tzinfo, utc: int) -> int:
+    """Return the UTC offset of an instant in seconds."""
+    offset = dt.fromtimestamp(utc, tz).utcoffset()
+    return int(offset.total_seconds())  # type: ignore[union-attr]
+
+
+def _by_day(
+    seconds: npt.NDArray[np.int64], offset: Callable[[int], int]
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.intp]]:
+    """Return offsets looked up at the start of each day.
+
+    Also return the positions in days whose offset changes before the next
+    day, which need a lookup of their own.
+    """
+    days = seconds // SECONDS_PER_DAY
+    first = int(days.min()) if len(days) else 0
+    last = int(days.max()) if len(days) else -1
+    bounds = np.array(
+        [offset(day * SECONDS_PER_DAY) for day in range(first, last + 2)],
+        dtype=np.int64,
+    )
+    index = days - first
+    offsets = bounds[index]
+    return offsets, np.flatnonzero(offsets != bounds[index + 1])
+
+
+def _fixed_offset(tz: tzinfo) -> int | None:
+    """Return the offset of a timezone without DST in seconds, else None."""
+    offset = tz.utcoffset(None)
+    return None if offset is None else int(offset.total_seconds())
+
+
+def utc_offsets(utc: npt.NDArray[np.int64], tz: tzinfo) -> npt.NDArray[np.int64]:
+    """Return the UTC offsets of instants in seconds.
+
+    Offsets are looked up once per day, and per instant on days with a
+    DST change.
+    """
+    if (fixed := _fixed_offset(tz)) is not None:
+        return np.full(len(utc), fixed, dtype=np.int64)
+    offsets, changing = _by_day(utc, partial(_utc_offset, tz))
+    for position in changing.tolist():
+        offsets[position] = _utc_offset(tz, int(utc[position]))
+    return offsets
+
+
+def localize(wall: npt.NDArray[np.int64], tz: tzinfo) -> npt.NDArray[np.int64]:
+    """Return the UTC instants of wall-clock times, in seconds.
+
+    When DST ends, the first occurrence of a repeated time is summer time
+    and the next one winter time; times skipped when DST starts are shifted
+    forward to the end of the gap (as pandas tz_localize).
+    """
+    if (fixed := _fixed_offset(tz)) is not None:
+        return wall - fixed
+    offsets, changing = _by_day(wall, partial(_offset, tz))
+    utc = wall - offsets
+    seen: set[int] = set()
+    for position in changing.tolist():
+        value = int(wall[position])
+        instant = value - _offset(tz, value, fold=int(value in seen))
+        seen.add(value)
+        if instant + _utc_offset(tz, instant) != value:
+            # Skipped time: first instant with the offset after the gap.
+            low, high = instant - SECONDS_PER_DAY, instant
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _utc_offset(tz, middle) == _utc_offset(tz, high):
+                    high = middle
+                else:
+                    low = middle
+            instant = high
+        utc[position] = instant
+    return utc
+
+
+def _cumsum(
+    values: npt.NDArray[np.float64],
+    notes: npt.NDArray[np.int8],
+    initial: dict[str, Any],
+) -> npt.NDArray[np.float64]:
+    """Return the cumulative sum of values by notes, from initial values."""
+    sums = np.full(len(values), np.nan)
+    for code, note in enumerate(NOTES):
+        selected = notes == code
+        if not selected.any():
+            continue
+        note_values = values[selected]
+        note_sums = np.nancumsum(note_values) + initial.get(note, 0)
+        note_sums[np.isnan(note_values)] = np.nan
+        sums[selected] = note_sums
+    return sums
+
+
+def analyze(
+    readings: Readings,
+    step_hour: bool,
+    tz: tzinfo,
+    convertKwh: bool = False,
+    convertUTC: bool = False,
+    start_date: dt | None = None,
+    intervals: list[tuple[str, str]] | None = None,
+    groupby: bool = False,
+    summary: bool = False,
+    cum_value: dict[str, Any] | None = None,
+    cum_price: dict[str, Any] | None = None,
+    prices: dict[str, Any] | None = None,
+    tempo: dict[str, str] | None = None,
+    downcast: bool = False,
+) -> Columns:
+    """Analyze readings, see EnedisAnalytics.get_data_analytics.
+
+    step_hour: readings are a load curve, dated at the end of their interval
+
+    Return the columns: date (int64 seconds since epoch in UTC), value,
+    interval_length (load curves not grouped), notes (int8 codes of NOTES),
+    and when requested tempo (int8 codes of tempo_categories, -1 if
+    missing), price, sum_price and sum_value.
+    """
+    clock_tz: tzinfo = timezone.utc if convertUTC else tz
+    utc = localize(readings.timestamps, tz)
+    values = readings.values
+    lengths = readings.intervals
+    if start_date:
+        if start_date.tzinfo is None:
+            start_date = start_date.replace(tzinfo=tz)
+        kept = utc > int(start_date.timestamp())
+        utc, values, lengths = utc[kept], values[kept], lengths[kept]
+
+    columns: Columns = {"date": utc}
+    columns["value"] = values / 1000 if convertKwh else values.copy()
+    if step_hour:
+        weights = np.where(lengths > 0, lengths / 60, 1.0)
+        columns["value"] *= weights
+        columns["interval_length"] = weights
+        # Interval starts, ex: 00:30 for the reading of 01:00 (PT30M)
+        starts = utc - np.where(lengths > 0, lengths.astype(np.int64) * 60, 3600)
+    else:
+        starts = utc
+
+    notes = np.full(len(utc), NOTES.index(ATTR_STANDARD), dtype=np.int8)
+    # Daily readings have no time of day, they stay standard.
+    if intervals and step_hour and len(utc):
+        minutes = (utc + utc_offsets(utc, clock_tz)) // 60 % MINUTES_PER_DAY
+        notes[offpeak_mask(intervals)[minutes]] = NOTES.index(ATTR_OFFPEAK)
+    columns["notes"] = notes
+
+    if groupby:
+        clock = starts + (utc_offsets(starts, clock_tz) if len(starts) else 0)
+        if step_hour:
+            buckets = starts - clock % 3600
+        else:
+            buckets = localize(clock - clock % SECONDS_PER_DAY, clock_tz)
+        order = np.lexsort((buckets, notes))
+        keys = np.stack((notes[order].astype(np.int64), buckets[order]))
+        # Position of the first row of each group (none without rows).
+        first = np.flatnonzero(
+            np.concatenate(([True], (keys[:, 1:] != keys[:, :-1]).any(axis=0)))
+        )[: len(order)]
+        sorted_values = np.nan_to_num(columns["value"][order])
+        columns = {
+            "notes": notes[order][first],
+            "date": buckets[order][first],
+            "value": (
+                np.add.reduceat(sorted_values, first)
+                if len(first)
+                else sorted_values[:0]
+            ),
+        }
+        notes = columns["notes"]
+        starts = columns["date"]
+
+    if tempo:
+        categories = tempo_categories(tempo)
+        days, colors = [], []
+        for day, color in tempo.items():
+            try:
+                days.append(np.datetime64(day, "D").astype(np.int64))
+            except ValueError:
+                continue
+            colors.append(categories.index(color))
+        order = np.argsort(days)
+        tempo_days = np.asarray(days, dtype=np.int64)[order]
+        tempo_colors = np.asarray(colors, dtype=np.int8)[order]
+        clock = starts + (utc_offsets(starts, clock_tz) if len(starts) else 0)
+        day_numbers = clock // SECONDS_PER_DAY
+        position = np.searchsorted(tempo_days, day_numbers).clip(
+            max=max(len(tempo_days) - 1, 0)
+        )
+        found = (
+            tempo_days[position] == day_numbers
+            if len(tempo_days)
+            else np.zeros(len(day_numbers), dtype=bool)
+        )
+        columns["tempo"] = np.where(
+            found, tempo_colors[position] if len(tempo_colors) else -1, -1
+        ).astype(np.int8)
+
+    if prices:
+        table = price_table(prices, bool(tempo))
+        rows = np.array(
+            [list(prices).index(note) if note in prices else -1 for note in NOTES]
+            + [-1]
+        )
+        if tempo:
+            positions = np.array(
+                [
+                    TEMPO_COLORS.index(color) if color in TEMPO_COLORS else -1
+                    for color in tempo_categories(tempo)
+                ]
+                + [-1]
+            )
+            colors_index = positions[columns["tempo"]]
+        else:
+            colors_index = np.full(len(notes), -1)
+        # Code -1 (unknown) selects the last row or column.
+        columns["price"] = columns["value"] * table[rows[notes], colors_index]
+        if summary:
+            columns["sum_price"] = _cumsum(columns["price"], notes, cum_price or {})
+
+    if summary:
+        columns["sum_value"] = _cumsum(columns["value"], notes, cum_value or {})
+
+    if downcast:
+        columns = {
+            name: column.astype(np.float32) if column.dtype == np.float64 else column
+            for name, column in columns.items()
+        }
+    return columns
@@ -0,0 +1,179 @@
+"""Columnar container for meter readings."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from datetime import datetime as dt
+import re
+from typing import Any, Literal
+
+import numpy as np
+import numpy.typing as npt
+
+from .tz import as_wall_clock
+
+DAILY_FORMAT = "%Y-%m-%d"
+DETAIL_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def interval_code(interval: str | None) -> int:
+    """Return the interval length in minutes (0 if unknown)."""
+    if interval and len(rslt := re.findall("PT([0-9]{2})M", interval)) == 1:
+        return int(rslt[0])
+    return 0
+
+
+def _format_value(value: float) -> str | None:
+    """Format a value as returned by the API."""
+    if np.isnan(value):
+        return None
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+class Readings:
+    """Meter readings stored by columns.
+
+    timestamps: int64 seconds since epoch of the local wall-clock time
+                (Enedis dates are naive local times)
+    values:     float64 values (NaN when missing)
+    intervals:  int8 interval length in minutes, 0 for daily readings
+
+    Iterating gives the readings as returned by the API:
+    {"date": str, "value": str | None, "interval_length": str}
+    """
+
+    __slots__ = ("daily", "intervals", "timestamps", "values")
+
+    def __init__(
+        self,
+        timestamps: npt.ArrayLike = (),
+        values: npt.ArrayLike = (),
+        intervals: npt.ArrayLike = (),
+        daily: bool = False,
+    ) -> None:
+        """Initialize."""
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.intervals = np.asarray(intervals, dtype=np.int8)
+        if len(self.intervals) == 0:
+            self.intervals = np.zeros(len(self.timestamps), dtype=np.int8)
+        self.daily = daily
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict[str, Any]]) -> Readings:
+        """Build readings from the API interval_reading list."""
+        records = list(records)
+        dates = [record["date"] for record in records]
+        codes: dict[str | None, int] = {}
+        intervals = [
+            codes.setdefault(interval, interval_code(interval))
+            for interval in (record.get("interval_length") for record in records)
+        ]
+        return cls(
+            np.array(dates, dtype="datetime64[s]").astype(np.int64),
+            np.array([record.get("value") for record in records], dtype=np.float64),
+            intervals,
+            daily=all(len(date) == 10 for date in dates),
+        )
+
+    def to_records(self) -> list[dict[str, Any]]:
+        """Return readings in the API format."""
+        return list(self)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Iterate over readings in the API format."""
+        fmt = DAILY_FORMAT if self.daily else DETAIL_FORMAT
+        dates = self.timestamps.astype("datetime64[s]").tolist()
+        for date, value, interval in zip(
+            dates, self.values.tolist(), self.intervals.tolist()
+        ):
+            reading = {"date": date.strftime(fmt), "value": _format_value(value)}
+            if interval:
+                reading["interval_length"] = f"PT{interval:02d}M"
+            yield reading
+
+    def __len__(self) -> int:
+        """Return the number of readings."""
+        return len(self.timestamps)
+
+    def __getitem__(self, index: slice | npt.NDArray[np.bool_]) -> Readings:
+        """Return a slice (views, no copy) or a selection of readings."""
+        return Readings(
+            self.timestamps[index],
+            self.values[index],
+            self.intervals[index],
+            self.daily,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Compare readings."""
+        if not isinstance(other, Readings):
+            return NotImplemented
+        return (
+            np.array_equal(self.timestamps, other.timestamps)
+            and np.array_equal(self.values, other.values, equal_nan=True)
+            and np.array_equal(self.intervals, other.intervals)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def between(self, start: dt | None = None, end: dt | None = None) -> Readings:
+        """Return the readings of the intervals in [start, end) (views, no copy).
+
+        Readings are found by binary search on the sorted timestamps. Load
+        curve readings are dated at the end of their interval, daily ones at
+        the start. Aware dates are converted to the local time.
+        """
+        side: Literal["left", "right"] = "left" if self.daily else "right"
+        bounds = [
+            np.datetime64(as_wall_clock(date), "s").astype(np.int64)
+            for date in (start, end)
+            if date is not None
+        ]
+        low = np.searchsorted(self.timestamps, bounds[0], side) if start else 0
+        high = np.searchsorted(self.timestamps, bounds[-1], side) if end else len(self)
+        return self[int(low) : int(high)]
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the columns."""
+        return self.timestamps.nbytes + self.values.nbytes + self.intervals.nbytes
+
+    @property
+    def last(self) -> dt | None:
+        """Return the date of the last reading (naive local time)."""
+        if len(self) == 0:
+            return None
+        last: dt = self.timestamps.max().astype("datetime64[s]").item()
+        return last
+
+    @property
+    def start(self) -> dt | None:
+        """Return the start of the first interval (naive local time)."""
+        if len(self) == 0:
+            return None
+        starts = self.timestamps - self.intervals.astype(np.int64) * 60
+        start: dt = starts.min().astype("datetime64[s]").item()
+        return start
+
+    def merge(self, other: Readings) -> Readings:
+        """Merge readings, sorted by date.
+
+        Readings dated from the first to the last reading of other are
+        replaced by other. Repeated dates (the hour repeated when DST ends)
+        are kept, in their order, so other must not start inside the repeated
+        hour (the API returns whole days).
+        """
+        if len(other) == 0:
+            return self
+        kept = (self.timestamps < other.timestamps.min()) | (
+            self.timestamps > other.timestamps.max()
+        )
+        timestamps = np.concatenate((self.timestamps[kept], other.timestamps))
+        index = np.argsort(timestamps, kind="stable")
+        return Readings(
+            timestamps[index],
+            np.concatenate((self.values[kept], other.values))[index],
+            np.concatenate((self.intervals[kept], other.intervals))[index],
+            self.daily if len(self) else other.daily,
+        )
@@ -0,0 +1,209 @@
+"""Multi-resolution rollups of readings."""
+
+from __future__ import annotations
+
+from datetime import datetime as dt
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from .analytics import EnedisAnalytics, OutputFormat, format_output
+from .numpy_analytics import TEMPO_COLORS
+from .readings import Readings
+
+# Resolutions from the finest to the coarsest, with their NumPy unit.
+RESOLUTIONS = {"hour": "h", "day": "D", "month": "M", "year": "Y"}
+KEYS = ["date", "notes", "tempo"]
+
+
+def _datetime64(date: Any) -> np.datetime64:
+    """Return a date as a NumPy datetime in seconds."""
+    value: np.datetime64 = np.asarray([date], dtype="datetime64[s]")[0]
+    return value
+
+
+def _floor(dates: Any, resolution: str) -> npt.NDArray[np.datetime64]:
+    """Return dates rounded down to the resolution."""
+    unit = RESOLUTIONS[resolution]
+    floored: npt.NDArray[np.datetime64] = (
+        np.asarray(dates, dtype="datetime64[s]")
+        .astype(f"datetime64[{unit}]")
+        .astype("datetime64[s]")
+    )
+    return floored
+
+
+def _ceil(date: np.datetime64, resolution: str) -> np.datetime64:
+    """Return a date rounded up to the resolution."""
+    unit = RESOLUTIONS[resolution]
+    floored = date.astype(f"datetime64[{unit}]")
+    if floored.astype("datetime64[s]") == date:
+        return date
+    return _datetime64(floored + 1)
+
+
+class Rollups:
+    """Totals of readings by notes and tempo color at each resolution.
+
+    Buckets are dated by the local wall-clock time of their start (naive
+    datetime64[s]) and sorted by date. The finest resolution is the hour
+    for load curves and the day for daily readings; each coarser one is
+    summed from the previous one. Readings updated since a date only
+    recompute the buckets from that date.
+    """
+
+    def __init__(
+        self,
+        convertKwh: bool = True,
+        intervals: list[tuple[str, str]] | None = None,
+        prices: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize.
+
+        parameters: see EnedisAnalytics.get_data_analytics
+        """
+        self.convertKwh = convertKwh
+        self.intervals = intervals
+        self.prices = prices
+        self.finest = "hour"
+        self.levels: dict[str, pd.DataFrame] = {}
+
+    def update(
+        self,
+        readings: Readings,
+        tempo: dict[str, str] | None = None,
+        since: dt | None = None,
+    ) -> None:
+        """Update buckets from readings.
+
+        readings: all readings
+        tempo:    tempo days
+        since:    start of the first interval which changed (readings or
+                  tempo days), None to compute all buckets
+        """
+        self.finest = "day" if readings.daily else "hour"
+        resolutions = list(RESOLUTIONS)[list(RESOLUTIONS).index(self.finest) :]
+        if since is None or not self.levels:
+            self.levels = {}
+            first = np.datetime64("NaT", "s")
+        else:
+            first = _floor([since], self.finest)[0]
+
+        if np.isnat(first):
+            rows = readings
+        else:
+            rows = readings[
+                int(np.searchsorted(readings.timestamps, first.astype(np.int64))) :
+            ]
+        finer = self._aggregate(rows, tempo)
+        if not np.isnat(first):
+            finer = finer[finer.date.to_numpy() >= first]
+
+        for resolution in resolutions:
+            if resolution != self.finest:
+                if not np.isnat(first):
+                    first = _floor([first], resolution)[0]
+                    finer = self.buckets(
+                        resolutions[resolutions.index(resolution) - 1], first
+                    )
+                finer = self._group(finer, _floor(finer.date, resolution))
+            level = self.levels.get(resolution)
+            if level is not None and not np.isnat(first):
+                position = int(np.searchsorted(level.date.to_numpy(), first))
+                finer = pd.concat([level.iloc[:position], finer], ignore_index=True)
+            self.levels[resolution] = finer
+
+    def buckets(
+        self,
+        resolution: str,
+        start: dt | np.datetime64 | None = None,
+        end: dt | np.datetime64 | None = None,
+        output: OutputFormat = "dataframe",
+    ) -> Any:
+        """Return the buckets at the resolution starting in [start, end)."""
+        level = self.levels.get(resolution)
+        if level is None:
+            level = self._aggregate(Readings(), None)
+        dates = level.date.to_numpy()
+        low = 0 if start is None else int(np.searchsorted(dates, _datetime64(start)))
+        high = (
+            len(dates) if end is None else int(np.searchsorted(dates, _datetime64(end)))
+        )
+        return format_output(level.iloc[low:high], output)
+
+    def total(
+        self,
+        start: dt | np.datetime64,
+        end: dt | np.datetime64,
+        output: OutputFormat = "dataframe",
+    ) -> Any:
+        """Return totals by notes and tempo color from start to end.
+
+        The range is covered by the coarsest buckets which fit in it, ex:
+        from 2023-01-30 22:00 to 2024-03-02: two hours, two days, the months
+        of February to December 2023, January and February 2024 and one day.
+        Bounds are rounded down to the finest resolution.
+        """
+        resolutions = list(RESOLUTIONS)[list(RESOLUTIONS).index(self.finest) :]
+        low, high = _floor([start, end], self.finest)
+        pieces = []
+        for index, resolution in enumerate(resolutions):
+            if resolution == resolutions[-1]:
+                pieces.append(self.buckets(resolution, low, high))
+                break
+            coarser = resolutions[index + 1]
+            inner_low, inner_high = _ceil(low, coarser), _floor([high], coarser)[0]
+            if inner_low >= inner_high:
+                pieces.append(self.buckets(resolution, low, high))
+                break
+            pieces.append(self.buckets(resolution, low, inner_low))
+            pieces.append(self.buckets(resolution, inner_high, high))
+            low, high = inner_low, inner_high
+        rows = pd.concat(pieces, ignore_index=True)
+        totals = (
+            rows.drop(columns="date")
+            .groupby(["notes", "tempo"], observed=True, dropna=False)
+            .sum(min_count=1)
+            .reset_index()
+        )
+        return format_output(totals, output)
+
+    def _aggregate(
+        self, readings: Readings, tempo: dict[str, str] | None
+    ) -> pd.DataFrame:
+        """Return the buckets of readings at the finest resolution."""
+        rows: pd.DataFrame = EnedisAnalytics(readings).get_data_analytics(
+            convertKwh=self.convertKwh,
+            intervals=self.intervals,
+            groupby=True,
+            prices=self.prices,
+            tempo=tempo or None,
+            output="dataframe",
+        )
+        if rows.empty:
+            rows = pd.DataFrame(
+                {"date": pd.Series(dtype="datetime64[s]"), "notes": [], "value": []}
+            )
+        else:
+            rows["date"] = rows.date.dt.tz_localize(None).astype("datetime64[s]")
+        if "tempo" not in rows:
+            rows["tempo"] = pd.Categorical.from_codes(
+                np.full(len(rows), -1), categories=TEMPO_COLORS
+            )
+        if self.prices and "price" not in rows:
+            rows["price"] = np.full(len(rows), np.nan)
+        # Repeated hours when DST ends share one bucket.
+        return self._group(rows, rows.date.to_numpy())
+
+    @staticmethod
+    def _group(rows: pd.DataFrame, dates: npt.ArrayLike) -> pd.DataFrame:
+        """Sum rows by date, notes and tempo color."""
+        grouped = (
+            rows.assign(date=np.asarray(dates, dtype="datetime64[s]"))
+            .groupby(KEYS, observed=True, dropna=False, sort=True)
+            .sum(min_count=1)
+            .reset_index()
+        )
+        return grouped
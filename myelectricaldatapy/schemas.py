@@ -0,0 +1,65 @@
+"""Schemas of the collect parameters."""
+
+from __future__ import annotations
+
+from datetime import datetime as dt
+
+import voluptuous as vol
+
+from .const import (
+    ATTR_END,
+    ATTR_OFFPEAK,
+    ATTR_SERVICE,
+    ATTR_STANDARD,
+    ATTR_START,
+    CONSUMPTION,
+    PRODUCTION,
+)
+
+MODES_SCH = vol.Schema(
+    {
+        vol.Optional(CONSUMPTION): {
+            vol.Required(ATTR_SERVICE): str,
+            vol.Optional(ATTR_START): dt,
+            vol.Optional(ATTR_END): dt,
+        },
+        vol.Optional(PRODUCTION): {
+            vol.Required(ATTR_SERVICE): str,
+            vol.Optional(ATTR_START): dt,
+            vol.Optional(ATTR_END): dt,
+        },
+    }
+)
+
+PRICE_SCH = vol.Schema(
+    {
+        vol.Required(ATTR_STANDARD): {
+            vol.Required("price"): vol.Any(int, float),
+        },
+        vol.Optional(ATTR_OFFPEAK): {
+            vol.Required("price"): vol.Any(int, float),
+        },
+    }
+)
+
+PRICE_TEMPO_SCH = vol.Schema(
+    {
+        vol.Required(ATTR_STANDARD): {
+            vol.Required("blue"): vol.Any(int, float),
+            vol.Required("white"): vol.Any(int, float),
+            vol.Required("red"): vol.Any(int, float),
+        },
+        vol.Optional(ATTR_OFFPEAK): {
+            vol.Required("blue"): vol.Any(int, float),
+            vol.Required("white"): vol.Any(int, float),
+            vol.Required("red"): vol.Any(int, float),
+        },
+    }
+)
+
+CUM_SCH = vol.Schema(
+    {
+        vol.Required(ATTR_STANDARD): vol.Any(int, float),
+        vol.Optional(ATTR_OFFPEAK): vol.Any(int, float),
+    }
+)
@@ -0,0 +1,72 @@
+"""Incremental parser for interval_reading payloads."""
+
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any
+
+from .exceptions import EnedisException
+
+KEY = '"interval_reading"'
+WHITESPACES = " \t\r\n,"
+
+
+class IntervalReadingParser:
+    """Parse the interval_reading array of a response while it is received.
+
+    Body chunks are given to "feed" as they arrive, which returns the readings
+    completed by this chunk. Only the reading being received is kept in
+    memory, whatever the length of the array.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._in_array = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> list[dict[str, Any]]:
+        """Parse a chunk of the body, return the readings completed."""
+        readings: list[dict[str, Any]] = []
+        if self.done:
+            return readings
+        self._buffer += self._decoder.decode(chunk)
+
+        if not self._in_array:
+            if (index := self._buffer.find(KEY)) < 0:
+                # The key may be split between two chunks.
+                self._buffer = self._buffer[-len(KEY) :]
+                return readings
+            if (bracket := self._buffer.find("[", index + len(KEY))) < 0:
+                self._buffer = self._buffer[index:]
+                return readings
+            self._buffer = self._buffer[bracket + 1 :]
+            self._in_array = True
+
+        buffer = self._buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACES:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                self.done = True
+                break
+            try:
+                reading, pos = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Incomplete reading, wait for the next chunk.
+                break
+            readings.append(reading)
+
+        self._buffer = "" if self.done else buffer[pos:]
+        return readings
+
+    def close(self) -> None:
+        """Check the whole array has been received."""
+        if self._in_array and not self.done:
+            raise EnedisException("Incomplete interval_reading payload")
@@ -0,0 +1,110 @@
+"""Rate limiter and retry policy for MyElectricalData requests."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import time
+from weakref import WeakValueDictionary
+
+from .const import (
+    RATE_BURST,
+    RATE_LIMIT,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+    RETRY_MAX_BACKOFF,
+    RETRY_MAX_ELAPSED,
+)
+
+# Buckets by token digest, kept while a client uses them.
+_BUCKETS: WeakValueDictionary[str, TokenBucket] = WeakValueDictionary()
+
+
+class TokenBucket:
+    """Adaptive token bucket.
+
+    Each request takes one token, tokens are refilled at `rate` per second up
+    to `burst`. When the API answers that the quota is reached, the refill
+    rate is halved (down to `min_rate`) and then recovers step by step on
+    each successful request.
+    """
+
+    def __init__(
+        self, rate: float = RATE_LIMIT, burst: int = RATE_BURST, min_rate: float = 0.1
+    ) -> None:
+        """Initialize."""
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def async_acquire(self) -> None:
+        """Wait until a token is available."""
+        now = time.monotonic()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+        # Reserve the token now, concurrent callers queue up behind it.
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+    def penalize(self) -> None:
+        """Slow down after the quota has been reached."""
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self) -> None:
+        """Speed up again after a successful request."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    Quota errors (409 and 429), timeouts and connection errors are retried.
+    Use max_attempts=1 to raise them on the first failure.
+
+    max_attempts:   maximum number of attempts for one request (1 = no retry)
+    max_elapsed:    maximum time in seconds spent on one request, backoffs included
+    backoff:        base delay in seconds, doubled on each attempt
+    max_backoff:    maximum delay in seconds between two attempts
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_ATTEMPTS,
+        max_elapsed: float = RETRY_MAX_ELAPSED,
+        backoff: float = RETRY_BACKOFF,
+        max_backoff: float = RETRY_MAX_BACKOFF,
+    ) -> None:
+        """Initialize."""
+        self.max_attempts = max(1, max_attempts)
+        self.max_elapsed = max_elapsed
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt: int) -> float:
+        """Return the delay to wait before the next attempt."""
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        )
+
+
+def get_bucket(token: str) -> TokenBucket:
+    """Return the token bucket shared by all requests made with this token.
+
+    The bucket lives as long as a client uses it, and is keyed by a digest
+    of the token (the token itself is not kept).
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    if (bucket := _BUCKETS.get(key)) is None:
+        bucket = _BUCKETS[key] = TokenBucket()
+    return bucket
+
+
+def reset_buckets() -> None:
+    """Forget the shared token buckets and their penalties."""
+    _BUCKETS.clear()
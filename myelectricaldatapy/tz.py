@@ -43,3 +43,10 @@ def as_local(value: dt) -> dt:
     if value.tzinfo is None:
         return value.replace(tzinfo=LOCAL_TIMEZONE)
     return value
+
+
+def as_wall_clock(value: dt) -> dt:
+    """Return the naive local time of a datetime; pass naive ones through."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(LOCAL_TIMEZONE).replace(tzinfo=None)
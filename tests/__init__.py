@@ -2,10 +2,37 @@
 
 from __future__ import annotations
 
+from datetime import datetime as dt, timedelta, timezone
 from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+PARIS = ZoneInfo("Europe/Paris")
 
 
 def load_fixture(filename: str) -> str:
     """Load a fixture."""
     path = Path(__package__) / "fixtures" / filename
     return path.read_text(encoding="utf-8")
+
+
+def load_curve(start: dt, end: dt) -> list[dict[str, Any]]:
+    """Return a 30 minutes load curve of Europe/Paris from start to end (UTC).
+
+    Readings are dated at the end of their interval, in naive local time as
+    returned by the API: the hour repeated when DST ends appears twice.
+    """
+    readings = []
+    date = start.replace(tzinfo=timezone.utc)
+    while date < end.replace(tzinfo=timezone.utc):
+        date += timedelta(minutes=30)
+        wall = date.astimezone(PARIS).replace(tzinfo=None)
+        value = 100 + int(date.timestamp()) // 1800 % 50
+        readings.append(
+            {
+                "date": wall.strftime("%Y-%m-%d %H:%M:%S"),
+                "value": str(value),
+                "interval_length": "PT30M",
+            }
+        )
+    return readings
@@ -9,9 +9,17 @@ from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from myelectricaldatapy.throttle import reset_buckets
 from tests import load_fixture
 
 
+@pytest.fixture(autouse=True)
+def clear_buckets() -> Generator[None, None, None]:
+    """Do not carry rate limiter penalties from one test to another."""
+    yield
+    reset_buckets()
+
+
 @pytest.fixture(name="mock_detail")
 def mock_detail() -> dict[str, Any]:
     return json.loads(load_fixture("detail.json"))
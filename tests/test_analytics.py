@@ -2,26 +2,39 @@
 
 from __future__ import annotations
 
-from datetime import datetime as dt
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt, timedelta
+import json
+import logging
+import math
 from typing import Any
 from unittest.mock import Mock, patch
+import warnings
+from zoneinfo import ZoneInfo
 
 from aiohttp import ClientSession
 from freezegun import freeze_time
+import numpy as np
 import pytest
 
 import myelectricaldatapy
 from myelectricaldatapy import EnedisByPDL, LimitReached
+from myelectricaldatapy.analytics import EnedisAnalytics, EnedisIncrementalAnalytics
+from myelectricaldatapy.readings import Readings
+from myelectricaldatapy.rollup import Rollups
 from myelectricaldatapy.tz import LOCAL_TIMEZONE
 
+from . import PARIS, load_curve, load_fixture
 from .consts import PDL, TOKEN
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
-async def test_compute(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+async def test_compute(mock_enedis: Mock, backend: str) -> None:  # pylint: disable=unused-argument
     """Test standard."""
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve")
+    api.set_collects("consumption_load_curve", backend=backend)
     await api.async_update()
     resultat = api.stats["consumption"]
 
@@ -29,7 +42,7 @@ async def test_compute(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
     assert resultat[0]["value"] == 1.296
 
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("daily_consumption")
+    api.set_collects("daily_consumption", backend=backend)
     await api.async_update()
     resultat = api.stats["consumption"]
 
@@ -37,23 +50,25 @@ async def test_compute(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
     assert resultat[0]["value"] == 42.045
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
 async def test_without_offpeak(
     mock_enedis: Mock,
+    backend: str,
 ) -> None:  # pylint: disable=unused-argument
     """Test without offpeak , with price."""
     await mock_enedis()
     prices: dict[str, Any] = {"standard": {"price": 0.17}}
     # Test standard price
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve", prices=prices)
+    api.set_collects("consumption_load_curve", prices=prices, backend=backend)
     await api.async_update_collects()
     resultat = api.stats["consumption"]
 
     assert resultat[0]["notes"] == "standard"
     assert round(resultat[0]["price"], 2) == 0.22
 
-    api.set_collects("daily_consumption", prices=prices)
+    api.set_collects("daily_consumption", prices=prices, backend=backend)
     await api.async_update_collects()
     resultat = api.stats["consumption"]
 
@@ -61,15 +76,19 @@ async def test_without_offpeak(
     assert round(resultat[0]["price"], 2) == 7.15
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
 async def test_with_offpeak(
     mock_enedis: Mock,  # pylint: disable=unused-argument
+    backend: str,
 ) -> None:
     """Test without offpeak , with price."""
     intervals = [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")]
     prices: dict[str, Any] = {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}}
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve", prices=prices, intervals=intervals)
+    api.set_collects(
+        "consumption_load_curve", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
 
@@ -81,7 +100,9 @@ async def test_with_offpeak(
 
     # Without cums
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve", prices=prices, intervals=intervals)
+    api.set_collects(
+        "consumption_load_curve", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
 
@@ -93,7 +114,7 @@ async def test_with_offpeak(
 
     # Without price
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve", intervals=intervals)
+    api.set_collects("consumption_load_curve", intervals=intervals, backend=backend)
     await api.async_update_collects()
     resultat = api.stats["consumption"]
     assert resultat[27]["value"] == 1.296
@@ -102,7 +123,9 @@ async def test_with_offpeak(
 
     # Daily
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("daily_consumption", prices=prices, intervals=intervals)
+    api.set_collects(
+        "daily_consumption", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
 
@@ -110,23 +133,28 @@ async def test_with_offpeak(
     print(resultat)
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
 async def test_daily_with_offpeak(
     mock_enedis: Mock,  # pylint: disable=unused-argument
+    backend: str,
 ) -> None:
     """Test daily with offpeak."""
     prices: dict[str, Any] = {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}}
     intervals = [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")]
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("daily_consumption", prices=prices, intervals=intervals)
+    api.set_collects(
+        "daily_consumption", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
     assert resultat[359]["value"] == 68.68
     print(resultat)
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
-async def test_compare(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+async def test_compare(mock_enedis: Mock, backend: str) -> None:  # pylint: disable=unused-argument
     """Test details compare."""
     prices: dict[str, Any] = {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}}
     cumsum_value: dict[str, Any] = {
@@ -145,6 +173,7 @@ async def test_compare(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
         intervals=intervals,
         cum_value=cumsum_value,
         cum_price=cumsum_price,
+        backend=backend,
     )
     await api.async_update()
     resultat1 = api.stats["consumption"]
@@ -187,6 +216,7 @@ async def test_compare(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
             intervals=intervals,
             cum_value=cumsum_value,
             cum_price=cumsum_price,
+            backend=backend,
         )
         await api.async_update(force_refresh=True)
         resultat2 = api.stats["consumption"]
@@ -194,8 +224,9 @@ async def test_compare(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
     print(resultat2)
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
-async def test_cumsums(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+async def test_cumsums(mock_enedis: Mock, backend: str) -> None:  # pylint: disable=unused-argument
     """Test cumulative summary."""
     prices: dict[str, Any] = {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}}
     cumsum_value: dict[str, Any] = {"standard": 100, "offpeak": 1000}
@@ -210,6 +241,7 @@ async def test_cumsums(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
         intervals=intervals,
         cum_value=cumsum_value,
         cum_price=cumsum_price,
+        backend=backend,
     )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
@@ -221,8 +253,9 @@ async def test_cumsums(mock_enedis: Mock) -> None:  # pylint: disable=unused-arg
     assert resultat[27]["sum_price"] == resultat[27]["price"] + 50
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
-async def test_extra_date(mock_base: Mock, mock_detail) -> None:  # pylint: disable=unused-argument
+async def test_extra_date(mock_base: Mock, mock_detail, backend: str) -> None:  # pylint: disable=unused-argument
     """Test cumulative summary."""
     prices: dict[str, Any] = {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}}
     intervals = [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")]
@@ -233,6 +266,7 @@ async def test_extra_date(mock_base: Mock, mock_detail) -> None:  # pylint: disa
         end=dt.strptime("2023-03-28", "%Y-%m-%d").replace(tzinfo=LOCAL_TIMEZONE),
         prices=prices,
         intervals=intervals,
+        backend=backend,
     )
     with patch("myelectricaldatapy.Enedis.async_fetch_datas", return_value=mock_detail):
         await api.async_update_collects()
@@ -248,6 +282,7 @@ async def test_extra_date(mock_base: Mock, mock_detail) -> None:  # pylint: disa
         end=dt.strptime("2023-03-28", "%Y-%m-%d").replace(tzinfo=LOCAL_TIMEZONE),
         prices=prices,
         intervals=intervals,
+        backend=backend,
     )
     with patch(
         "myelectricaldatapy.Enedis.async_fetch_datas",
@@ -258,8 +293,9 @@ async def test_extra_date(mock_base: Mock, mock_detail) -> None:  # pylint: disa
         assert resultat[0]["sum_value"] is not None
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-3-1")
-async def test_tempo(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+async def test_tempo(mock_enedis: Mock, backend: str) -> None:  # pylint: disable=unused-argument
     """Test tempo pricings."""
     prices: dict[str, Any] = {
         "standard": {
@@ -283,6 +319,7 @@ async def test_tempo(mock_enedis: Mock) -> None:  # pylint: disable=unused-argum
         intervals=intervals,
         cum_value=cumsum_value,
         cum_price=cumsum_price,
+        backend=backend,
     )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
@@ -295,40 +332,50 @@ async def test_tempo(mock_enedis: Mock) -> None:  # pylint: disable=unused-argum
 
     # Check Daily -> compute not possible.
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("daily_production", prices=prices, intervals=intervals)
+    api.set_collects(
+        "daily_production", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats.get("production")
     assert resultat[0].get("tempo") is None
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-03-01")
 async def test_standard_offpeak_cumsum(
     mock_enedis: Mock,  # pylint: disable=unused-argument
+    backend: str,
 ) -> None:
     """Test with offpeak and cumsum."""
     prices: dict[str, Any] = {"standard": {"price": 0.5}, "offpeak": {"price": 1}}
     intervals = [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")]
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve", prices=prices, intervals=intervals)
+    api.set_collects(
+        "consumption_load_curve", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
     assert resultat[0]["value"] == 1.079
 
     # Test daily data , check ignore intervals.
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("daily_consumption", prices=prices, intervals=intervals)
+    api.set_collects(
+        "daily_consumption", prices=prices, intervals=intervals, backend=backend
+    )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
     assert resultat[0]["price"] == resultat[0]["value"] * 0.5
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @pytest.mark.asyncio
-async def test_start_date(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+async def test_start_date(mock_enedis: Mock, backend: str) -> None:  # pylint: disable=unused-argument
     """Test with start_date."""
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
     api.set_collects(
         "consumption_load_curve",
         start=dt.strptime("2023-3-7", "%Y-%m-%d").replace(tzinfo=LOCAL_TIMEZONE),
+        backend=backend,
     )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
@@ -337,21 +384,24 @@ async def test_start_date(mock_enedis: Mock) -> None:  # pylint: disable=unused-
     api.set_collects(
         "consumption_load_curve",
         start=dt.strptime("2023-3-7", "%Y-%m-%d").replace(tzinfo=LOCAL_TIMEZONE),
+        backend=backend,
     )
     await api.async_update_collects()
     resultat = api.stats["consumption"]
     assert len(resultat) == 0
 
 
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
 @freeze_time("2023-3-1")
 async def test_twice_call(
     mock_enedis: Mock,  # pylint: disable=unused-argument
+    backend: str,
 ) -> None:
     """Tests raise exception."""
     intervals = [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")]
     api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
-    api.set_collects("consumption_load_curve", intervals=intervals)
-    api.set_collects("daily_production")
+    api.set_collects("consumption_load_curve", intervals=intervals, backend=backend)
+    api.set_collects("daily_production", backend=backend)
     await api.async_update()
     assert len(api.stats["consumption"]) != 0
     assert len(api.stats["production"]) != 0
@@ -359,3 +409,585 @@ async def test_twice_call(
     assert api.stats["production"][0]["notes"] == "standard"
     await api.async_update()
     assert api.last_access is not None
+
+
+@pytest.mark.parametrize("fixture", ["detail.json", "daily.json"])
+def test_readings(fixture: str) -> None:
+    """Test analytics from columnar readings match analytics from records."""
+    data = json.loads(load_fixture(fixture))["meter_reading"]["interval_reading"]
+    readings = Readings.from_records(data)
+    assert readings.nbytes == len(data) * 17
+
+    params: dict[str, Any] = {
+        "convertKwh": True,
+        "intervals": [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")],
+        "groupby": True,
+        "summary": True,
+        "prices": {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}},
+    }
+    expected = EnedisAnalytics(data).get_data_analytics(**params)
+    resultat = EnedisAnalytics(readings).get_data_analytics(**params)
+    assert resultat == expected
+
+
+def test_merge_dst() -> None:
+    """Test merge keeps the hour repeated when DST ends."""
+    data = load_curve(dt(2023, 10, 28, 12), dt(2023, 10, 29, 12))
+    dates = [reading["date"] for reading in data]
+    assert dates.count("2023-10-29 02:30:00") == 2
+
+    # Sorted by date, repeated dates in their order.
+    readings = Readings.from_records(sorted(data, key=lambda reading: reading["date"]))
+    assert Readings().merge(Readings.from_records(data)) == readings
+    for cut in (10, 20, 27, 33, 40):
+        first = Readings.from_records(data[:cut])
+        # Overlapping batch, ex: the day collected again.
+        merged = first.merge(Readings.from_records(data[cut - 5 :]))
+        assert merged == readings
+
+    # Readings of other replace the ones of self in its range.
+    changed = [{**reading, "value": "1"} for reading in data[20:35]]
+    merged = readings.merge(Readings.from_records(changed))
+    assert len(merged) == len(readings)
+    assert merged.values.sum() == readings.values.sum() - (
+        readings.values[20:35].sum() - 15
+    )
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_tempo_days(mock_detail, backend: str) -> None:
+    """Test tempo colors joined on readings."""
+    data = mock_detail["meter_reading"]["interval_reading"]
+    analytics = EnedisAnalytics(data)
+    resultat = analytics.get_data_analytics(
+        convertKwh=True,
+        groupby=True,
+        tempo={"2023-03-01": "blue", "2023-03-02": "red", "invalid": "white"},
+        backend=backend,
+    )
+    colors = {str(rslt["date"].date()): rslt["tempo"] for rslt in resultat}
+    assert colors == {"2023-03-01": "blue", "2023-03-02": "red", "2023-03-03": None}
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_offpeak_midnight(mock_detail, backend: str) -> None:
+    """Test offpeak ranges crossing midnight."""
+    mask = EnedisAnalytics.offpeak_mask([("22:00:00", "06:00"), ("12:30", "14:00")])
+    assert mask.sum() == 8 * 60 + 90
+    assert mask[0] and mask[6 * 60] and not mask[22 * 60]
+
+    data = mock_detail["meter_reading"]["interval_reading"]
+    resultat = EnedisAnalytics(data).get_data_analytics(
+        intervals=[("22:00:00", "06:00:00")],
+        groupby=True,
+        backend=backend,
+    )
+    for rslt in resultat:
+        offpeak = rslt["date"].hour >= 22 or rslt["date"].hour < 6
+        assert rslt["notes"] == ("offpeak" if offpeak else "standard")
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_offpeak_daily(mock_daily, backend: str) -> None:
+    """Test daily readings stay standard with offpeak ranges."""
+    data = mock_daily["meter_reading"]["interval_reading"]
+    resultat = EnedisAnalytics(data).get_data_analytics(
+        convertKwh=True,
+        intervals=[("22:00:00", "06:00:00")],
+        groupby=True,
+        prices={"standard": {"price": 0.2}, "offpeak": {"price": 0.1}},
+        backend=backend,
+    )
+    assert len(resultat) == len(data)
+    assert {rslt["notes"] for rslt in resultat} == {"standard"}
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_price_table(mock_detail, backend: str) -> None:
+    """Test prices looked up by notes and tempo color."""
+    data = mock_detail["meter_reading"]["interval_reading"]
+    prices = {
+        "standard": {"blue": 0.2, "white": 0.3, "red": 3},
+        "offpeak": {"blue": 0.1, "white": 0.2, "red": 1.5},
+    }
+    resultat = EnedisAnalytics(data).get_data_analytics(
+        convertKwh=True,
+        intervals=[("01:30:00", "08:00:00")],
+        groupby=True,
+        summary=True,
+        prices=prices,
+        tempo={"2023-03-01": "blue", "2023-03-02": "red"},
+        cum_price={"standard": 10},
+        backend=backend,
+    )
+    sums = {"standard": 10.0, "offpeak": 0.0}
+    for rslt in resultat:
+        if rslt["tempo"] is None:
+            assert math.isnan(rslt["price"])
+            continue
+        assert rslt["price"] == rslt["value"] * prices[rslt["notes"]][rslt["tempo"]]
+        sums[rslt["notes"]] += rslt["price"]
+        assert round(rslt["sum_price"], 6) == round(sums[rslt["notes"]], 6)
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_dst_dates(backend: str) -> None:
+    """Test repeated and skipped local times around DST changes."""
+    data = [
+        {"date": date, "value": "1000", "interval_length": "PT30M"}
+        for date in (
+            "2023-03-26 02:30:00",
+            "2023-10-29 02:30:00",
+            "2023-10-29 02:30:00",
+        )
+    ]
+    analytics = EnedisAnalytics(data)
+    analytics.local_timezone = ZoneInfo("Europe/Paris")
+    resultat = analytics.get_data_analytics(convertUTC=True, backend=backend)
+    assert [str(rslt["date"]) for rslt in resultat] == [
+        "2023-03-26 01:00:00+00:00",
+        "2023-10-29 00:30:00+00:00",
+        "2023-10-29 01:30:00+00:00",
+    ]
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_dst_hours(backend: str) -> None:
+    """Test hours repeated when DST ends are grouped apart."""
+    data = [
+        {"date": date, "value": "1000", "interval_length": "PT30M"}
+        for date in (
+            "2023-10-29 02:30:00",
+            "2023-10-29 02:30:00",
+            "2023-10-29 03:00:00",
+        )
+    ]
+    analytics = EnedisAnalytics(data)
+    analytics.local_timezone = ZoneInfo("Europe/Paris")
+    resultat = analytics.get_data_analytics(groupby=True, backend=backend)
+    assert [(str(rslt["date"]), rslt["value"]) for rslt in resultat] == [
+        ("2023-10-29 02:00:00+02:00", 500),
+        ("2023-10-29 02:00:00+01:00", 1000),
+    ]
+
+
+@pytest.mark.parametrize("groupby", [True, False])
+@pytest.mark.parametrize("fixture", ["detail.json", "daily.json"])
+def test_numpy_backend(fixture: str, groupby: bool) -> None:
+    """Test the NumPy backend gives the results of the pandas backend."""
+    data = json.loads(load_fixture(fixture))["meter_reading"]["interval_reading"]
+    params: dict[str, Any] = {
+        "convertKwh": True,
+        "intervals": [("22:00:00", "06:00:00")],
+        "groupby": groupby,
+        "summary": True,
+        "prices": {
+            "standard": {"blue": 0.2, "white": 0.3, "red": 3},
+            "offpeak": {"blue": 0.1, "white": 0.2, "red": 1.5},
+        },
+        "tempo": json.loads(load_fixture("tempo.json")),
+        "cum_value": {"standard": 100},
+        "start_date": dt(2022, 1, 1),
+        "output": "columns",
+    }
+    expected = EnedisAnalytics(data).get_data_analytics(**params)
+    resultat = EnedisAnalytics(Readings.from_records(data)).get_data_analytics(
+        backend="numpy", **params
+    )
+    assert resultat.keys() == expected.keys() - {"measure_type"}
+    for column, values in resultat.items():
+        if values.dtype == object:
+            assert list(values) == list(expected[column])
+        elif column == "date":
+            assert np.array_equal(values, expected[column])
+        else:
+            np.testing.assert_allclose(values, expected[column].astype(values.dtype))
+
+    params["output"] = "dataframe"
+    df = EnedisAnalytics(data).get_data_analytics(
+        backend="numpy", downcast=True, **params
+    )
+    assert df.value.dtype == np.float32
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_mixed_intervals(backend: str) -> None:
+    """Test weighting of a curve mixing interval lengths."""
+    data = [
+        {"date": "2023-03-01 00:10:00", "value": "600", "interval_length": "PT10M"},
+        {"date": "2023-03-01 00:15:00", "value": "400", "interval_length": "PT15M"},
+        {"date": "2023-03-01 00:30:00", "value": "1200", "interval_length": "PT30M"},
+        {"date": "2023-03-01 01:30:00", "value": "300", "interval_length": "PT60M"},
+        {"date": "2023-03-01 02:30:00", "value": "100", "interval_length": None},
+    ]
+    resultat = EnedisAnalytics(data).get_data_analytics(backend=backend)
+    assert [rslt["value"] for rslt in resultat] == [100, 100, 600, 300, 100]
+    assert [rslt["interval_length"] for rslt in resultat] == [
+        10 / 60,
+        0.25,
+        0.5,
+        1,
+        1,
+    ]
+
+
+def test_dtypes(mock_detail, caplog: pytest.LogCaptureFixture) -> None:
+    """Test categorical labels and downcast values."""
+    readings = mock_detail["meter_reading"]["interval_reading"]
+    params: dict[str, Any] = {
+        "convertKwh": True,
+        "intervals": [("01:30:00", "08:00:00")],
+        "prices": {"standard": {"blue": 0.17}, "offpeak": {"blue": 0.12}},
+        "tempo": {"2023-03-01": "blue"},
+        "summary": True,
+    }
+    expected = EnedisAnalytics(readings).get_data_analytics(**params)
+
+    analytics = EnedisAnalytics(readings)
+    with caplog.at_level(logging.DEBUG, logger="myelectricaldatapy.analytics"):
+        df = analytics.get_data_analytics(output="dataframe", downcast=True, **params)
+    assert "Frame memory" in caplog.text
+    assert df.notes.dtype == "category"
+    assert df.tempo.dtype == "category"
+    assert df.value.dtype == np.float32
+    assert df.sum_price.dtype == np.float32
+    labels = df.astype({"notes": object, "tempo": object, "value": np.float64})
+    assert analytics.memory_usage() < labels.memory_usage(deep=True).sum()
+
+    # Groupbys on categorical notes do not warn (observed default, pandas 2.2).
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        resultat = EnedisAnalytics(readings).get_data_analytics(downcast=True, **params)
+    assert resultat[0]["notes"] == expected[0]["notes"] == "standard"
+    assert [rslt["tempo"] for rslt in expected[-2:]] == [None, None]
+    assert [rslt["sum_value"] for rslt in resultat] == pytest.approx(
+        [rslt["sum_value"] for rslt in expected], rel=1e-6
+    )
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_reuse(mock_detail, backend: str) -> None:
+    """Test one instance answers many queries, parsing readings once."""
+    readings = mock_detail["meter_reading"]["interval_reading"]
+    queries: list[dict[str, Any]] = [
+        {"convertKwh": True, "groupby": True, "summary": True},
+        {"convertUTC": True, "start_date": dt(2023, 3, 1, 12)},
+        {
+            "intervals": [("01:30:00", "08:00:00")],
+            "prices": {"standard": {"price": 0.17}, "offpeak": {"price": 0.12}},
+            "tempo": {"2023-03-01": "blue"},
+        },
+        {"convertKwh": True, "groupby": True, "summary": True},
+    ]
+    expected = [
+        EnedisAnalytics(readings).get_data_analytics(
+            output="dataframe", backend=backend, **params
+        )
+        for params in queries
+    ]
+    analytics = EnedisAnalytics(readings)
+    with (
+        patch.object(
+            EnedisAnalytics, "_localize", side_effect=analytics._localize
+        ) as localize,
+        patch.object(
+            Readings, "from_records", side_effect=Readings.from_records
+        ) as from_records,
+    ):
+        for params, frame in zip(queries, expected):
+            resultat = analytics.get_data_analytics(
+                output="dataframe", backend=backend, **params
+            )
+            assert resultat.equals(frame)
+            assert analytics.df.equals(resultat)
+            # Results are copies, changing them does not change the next ones.
+            resultat.loc[:, "value"] = 0.0
+            columns = analytics.get_data_analytics(output="columns", backend=backend)
+            for values in columns.values():
+                if values.dtype.kind == "f":
+                    values[:] = 0
+    parsed = localize if backend == "pandas" else from_records
+    assert parsed.call_count == 1
+
+
+def test_incremental(mock_detail) -> None:
+    """Test analytics updated with appended readings."""
+    readings = mock_detail["meter_reading"]["interval_reading"]
+    params: dict[str, Any] = {
+        "convertKwh": True,
+        "intervals": [("01:30:00", "08:00:00")],
+        "prices": {"standard": {"price": 0.17}, "offpeak": {"price": 0.12}},
+    }
+    analytics = EnedisIncrementalAnalytics(
+        window=timedelta(hours=6), cum_value={"standard": 10}, **params
+    )
+    rows = analytics.append(readings[:50])
+    assert len(rows) == len(analytics.get())
+    rows = analytics.append(readings[50:])
+    assert {rslt["date"] for rslt in rows} == {
+        rslt["date"] for rslt in analytics.get()[len(analytics.get()) - len(rows) :]
+    }
+
+    # Late correction inside the window
+    corrected = [dict(readings[-3], value="5000")]
+    rows = analytics.append(corrected)
+    assert [rslt["notes"] for rslt in rows] == ["standard", "standard"]
+
+    expected = EnedisAnalytics(readings[:-3] + corrected + readings[-2:])
+    expected_rows = expected.get_data_analytics(
+        groupby=True, summary=True, cum_value={"standard": 10}, **params
+    )
+    resultat = sorted(analytics.get(), key=lambda rslt: (rslt["notes"], rslt["date"]))
+    assert len(resultat) == len(expected_rows)
+    for rslt, expect in zip(resultat, expected_rows):
+        assert rslt.keys() == expect.keys()
+        assert rslt["date"] == expect["date"]
+        for key in ("value", "price", "sum_value", "sum_price"):
+            assert rslt[key] == pytest.approx(expect[key])
+
+    # Readings older than the window are ignored
+    assert analytics.append([dict(readings[0], value="0")]) == []
+    assert len(analytics.readings) < len(readings)
+
+
+def test_incremental_dst() -> None:
+    """Test appended readings across the end of DST match a full recompute."""
+    data = load_curve(dt(2023, 10, 27, 22), dt(2023, 10, 31, 23))
+    params: dict[str, Any] = {
+        "convertKwh": True,
+        "intervals": [("01:30:00", "08:00:00")],
+        "prices": {"standard": {"price": 0.17}, "offpeak": {"price": 0.12}},
+    }
+    with patch.object(EnedisAnalytics, "local_timezone", PARIS):
+        analytics = EnedisIncrementalAnalytics(**params)
+        # Days collected again from their start, as EnedisByPDL does.
+        days = [
+            index
+            for index, rslt in enumerate(data)
+            if rslt["date"].endswith(" 00:30:00")
+        ]
+        for start, end in zip(days, [*days[1:], len(data)]):
+            analytics.append(data[max(0, start - 10) : end])
+        expected = EnedisAnalytics(data).get_data_analytics(
+            groupby=True, summary=True, **params
+        )
+    resultat = sorted(analytics.get(), key=lambda rslt: (rslt["notes"], rslt["date"]))
+    assert len(resultat) == len(expected)
+    for rslt, expect in zip(resultat, expected):
+        assert rslt["date"] == expect["date"]
+        for key in ("value", "price", "sum_value", "sum_price"):
+            assert rslt[key] == pytest.approx(expect[key])
+    assert sum(rslt["value"] for rslt in resultat) == pytest.approx(
+        sum(int(rslt["value"]) for rslt in data) / 2000
+    )
+
+
+@freeze_time("2023-03-01")
+async def test_output_formats(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+    """Test analytics output formats."""
+    prices: dict[str, Any] = {"standard": {"price": 0.17}, "offpeak": {"price": 0.18}}
+    intervals = [("01:30:00", "08:00:00"), ("12:30:00", "14:00:00")]
+    api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+    api.set_collects("consumption_load_curve", prices=prices, intervals=intervals)
+    await api.async_update_collects()
+    records = api.stats["consumption"]
+
+    frame = api.get_stats(output="dataframe")["consumption"]
+    assert frame.to_dict(orient="records") == records
+
+    columns = api.get_stats(output="columns")["consumption"]
+    assert list(columns["value"]) == [rslt["value"] for rslt in records]
+    first = records[0]["date"].tz_convert("UTC").tz_localize(None)
+    assert columns["date"][0] == np.datetime64(first)
+
+    recarray = api.get_stats(output="recarray")["consumption"]
+    assert list(recarray.price) == [rslt["price"] for rslt in records]
+
+    rows = api.get_stats(output="iter")["consumption"]
+    assert not isinstance(rows, list)
+    assert list(rows) == records
+
+    with pytest.raises(ValueError):
+        api.get_stats(output="xml")
+
+
+@freeze_time("2023-03-01")
+async def test_stats_cache(mock_enedis: Mock, mock_detail) -> None:  # pylint: disable=unused-argument
+    """Test statistics computed once until something changes."""
+    api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+    api.set_collects("consumption_load_curve")
+    await api.async_update_collects()
+    with patch.object(
+        EnedisAnalytics,
+        "get_data_analytics",
+        autospec=True,
+        side_effect=EnedisAnalytics.get_data_analytics,
+    ) as analytics:
+        resultat = api.stats["consumption"]
+        assert api.stats["consumption"] is resultat
+        assert analytics.call_count == 1
+
+        # Same readings collected
+        await api.async_update_collects()
+        assert api.stats["consumption"] is resultat
+        api.get_stats(output="dataframe")
+        assert analytics.call_count == 2
+
+        api.tempo = {"2023-03-01": "blue"}
+        assert api.stats["consumption"] is not resultat
+        assert analytics.call_count == 3
+
+        api.set_collects("consumption_load_curve", intervals=[("01:30", "08:00")])
+        await api.async_update_collects()
+        assert api.stats["consumption"][0]["notes"] == "offpeak"
+        assert analytics.call_count == 4
+
+        readings = mock_detail["meter_reading"]["interval_reading"]
+        with patch.object(
+            myelectricaldatapy.Enedis,
+            "async_get_details_consumption",
+            side_effect=[
+                {"meter_reading": {"interval_reading": readings[:10]}},
+                {"meter_reading": {"interval_reading": readings[:20]}},
+            ],
+        ):
+            api.set_collects("consumption_load_curve")
+            await api.async_update_collects()
+            resultat = api.stats["consumption"]
+            assert analytics.call_count == 5
+            await api.async_update_collects()
+        assert len(api.stats["consumption"]) > len(resultat)
+        assert analytics.call_count == 6
+
+        api.invalidate_stats()
+        api.stats["consumption"]
+        assert analytics.call_count == 7
+
+
+async def test_async_stats(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
+    """Test statistics computed in an executor and shared by concurrent calls."""
+    api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+    api.set_collects("consumption_load_curve")
+    await api.async_update_collects()
+    with (
+        ThreadPoolExecutor(1) as executor,
+        patch.object(
+            EnedisAnalytics,
+            "get_data_analytics",
+            autospec=True,
+            side_effect=EnedisAnalytics.get_data_analytics,
+        ) as analytics,
+    ):
+        first, second = await asyncio.gather(
+            api.async_stats(executor=executor), api.async_stats(executor=executor)
+        )
+        assert first["consumption"] is second["consumption"]
+        assert api.stats["consumption"] is first["consumption"]
+        assert analytics.call_count == 1
+        assert not api._stats_inflight
+
+        rows = await api.async_stats(output="iter")
+        assert list(rows["consumption"]) == first["consumption"]
+        assert analytics.call_count == 2
+
+
+@freeze_time("2023-03-04")
+async def test_rollups(mock_enedis: Mock, mock_detail) -> None:  # pylint: disable=unused-argument
+    """Test rollups updated with collected readings."""
+    readings = mock_detail["meter_reading"]["interval_reading"]
+    prices = {
+        "standard": {"blue": 0.17, "white": 0.2, "red": 0.5},
+        "offpeak": {"blue": 0.12, "white": 0.1, "red": 0.3},
+    }
+    api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+    with (
+        patch.object(
+            myelectricaldatapy.Enedis,
+            "async_get_details_consumption",
+            side_effect=[
+                {"meter_reading": {"interval_reading": readings[:60]}},
+                {"meter_reading": {"interval_reading": readings[50:]}},
+                {"meter_reading": {"interval_reading": readings[50:]}},
+            ],
+        ),
+        patch.object(
+            Rollups, "update", autospec=True, side_effect=Rollups.update
+        ) as update,
+    ):
+        api.set_collects(
+            "consumption_load_curve",
+            intervals=[("01:30:00", "08:00:00")],
+            prices=prices,
+            incremental=True,
+        )
+        await api.async_update_collects()
+        rollups = api.get_rollups("consumption")
+        assert api.get_rollups("consumption") is rollups
+        await api.async_update_collects()
+        assert api.get_rollups("consumption") is rollups
+        assert update.call_args.args[3] == dt(2023, 3, 2, 1)
+
+        # Tempo key which is not a date, ignored.
+        update.reset_mock()
+        tempo = {**api.tempo, "not a date": "red"}
+        api.tempo_subscription(True)
+        with patch.object(
+            myelectricaldatapy.Enedis, "async_get_tempo", return_value=tempo
+        ):
+            await api.async_update_collects()
+        assert "not a date" in api.tempo
+        assert api.get_rollups("consumption") is rollups
+        update.assert_not_called()
+
+    expected = Rollups(intervals=[("01:30:00", "08:00:00")], prices=prices)
+    expected.update(Readings.from_records(readings), api.tempo)
+    for resolution, level in expected.levels.items():
+        assert rollups.buckets(resolution).equals(level)
+    assert len(rollups.buckets("day")) == 6
+    assert len(rollups.buckets("year")) == 4
+
+    stats = api.get_stats(output="dataframe")["consumption"]
+    day = rollups.buckets("day", dt(2023, 3, 2), dt(2023, 3, 3), output="records")
+    assert [(rslt["notes"], rslt["tempo"]) for rslt in day] == [
+        ("offpeak", "red"),
+        ("standard", "red"),
+    ]
+    start, end = dt(2023, 3, 1, 5), dt(2023, 3, 3, 2)
+    total = rollups.total(start, end)
+    dates = stats.date.dt.tz_localize(None)
+    selected = stats[(dates >= start) & (dates < end)]
+    assert total.value.sum() == pytest.approx(selected.value.sum())
+    assert total.price.sum() == pytest.approx(selected.price.sum())
+
+
+@freeze_time("2023-03-04")
+async def test_query(mock_enedis: Mock, mock_detail) -> None:  # pylint: disable=unused-argument
+    """Test range queries over collected readings."""
+    api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+    api.set_collects("consumption_load_curve")
+    await api.async_update_collects()
+
+    resultat = api.query("consumption", dt(2023, 3, 2), dt(2023, 3, 2, 2))
+    assert [str(rslt["date"]) for rslt in resultat] == [
+        "2023-03-02 00:30:00",
+        "2023-03-02 01:00:00",
+        "2023-03-02 01:30:00",
+        "2023-03-02 02:00:00",
+    ]
+    assert resultat[0]["interval_length"] == 30
+    assert len(api.query("consumption", start=dt(2023, 3, 3))) == 48
+    assert len(api.query("consumption", end=dt(2023, 3, 1, 1))) == 2
+    readings = mock_detail["meter_reading"]["interval_reading"]
+    assert len(api.query("consumption", output="dataframe")) == len(readings)
+
+    end = dt(2023, 3, 3, tzinfo=LOCAL_TIMEZONE)
+    days = api.query("consumption", dt(2023, 3, 2), end, freq="day")
+    assert [str(rslt["date"]) for rslt in days] == ["2023-03-02 00:00:00"]
+    assert days[0]["value"] == pytest.approx(
+        sum(float(rslt["value"]) for rslt in readings[48:96]) / 2000
+    )
+    hours = api.query("consumption", dt(2023, 3, 2), end, freq="hour")
+    assert len(hours) == 24
+
+    with pytest.raises(ValueError):
+        api.query("consumption", freq="week")
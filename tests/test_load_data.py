@@ -2,17 +2,40 @@
 
 from __future__ import annotations
 
-from datetime import datetime as dt
-from unittest.mock import Mock, patch
+import asyncio
+from contextlib import aclosing
+from datetime import date, datetime as dt
+import gc
+import json
+import subprocess
+import sys
+import time
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
 
 from aiohttp import ClientSession
 from freezegun import freeze_time
 import pytest
 
 import myelectricaldatapy
-from myelectricaldatapy import Enedis, EnedisByPDL, EnedisException, LimitReached
+from myelectricaldatapy import (
+    Enedis,
+    EnedisByPDL,
+    EnedisCache,
+    EnedisException,
+    EnedisFleet,
+    LimitReached,
+    RetryPolicy,
+    TimeoutExceededError,
+    TokenBucket,
+)
+from myelectricaldatapy.analytics import EnedisAnalytics
+from myelectricaldatapy.auth import EnedisAuth
+from myelectricaldatapy.stream import IntervalReadingParser
+from myelectricaldatapy.throttle import _BUCKETS, get_bucket, reset_buckets
 from myelectricaldatapy.tz import LOCAL_TIMEZONE, local_now
 
+from . import PARIS, load_curve, load_fixture
 from .consts import PDL, TOKEN
 
 
@@ -108,6 +131,19 @@ async def test_check_offpeak(mock_contract) -> None:
         )
 
 
+@freeze_time("2023-03-01")
+async def test_check_offpeak_midnight(mock_contract) -> None:
+    """Test off-peak hour detection with a range crossing midnight."""
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth, "async_request", return_value=mock_contract
+    ):
+        api = Enedis(token=TOKEN, session=ClientSession())
+        api.offpeaks = [("22H00", "6H00")]
+        for hour, offpeak in ((23, True), (0, True), (6, True), (7, False)):
+            start = dt(2023, 3, 1, hour, 0, tzinfo=LOCAL_TIMEZONE)
+            assert await api.async_check_offpeak(PDL, start) is offpeak
+
+
 async def test_valid_access(mock_enedis: Mock) -> None:  # pylint: disable=unused-argument
     """Test access."""
     api = Enedis(token=TOKEN, session=ClientSession())
@@ -220,3 +256,478 @@ async def test_exception(
             pass
         assert api.last_access is not None
         assert api.access["valid"] is True
+
+
+async def test_concurrent_details(mock_detail) -> None:
+    """Test load curve chunks fetched concurrently, in order."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fetch(_api, service, pdl, start, end):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Later chunks answer first
+        await asyncio.sleep(0.01 * (30 - start.day))
+        in_flight -= 1
+        return {
+            "meter_reading": {
+                "interval_reading": [{"date": start.strftime("%Y-%m-%d")}]
+            }
+        }
+
+    with patch.object(myelectricaldatapy.Enedis, "async_fetch_datas", new=fetch):
+        api = Enedis(token=TOKEN, session=ClientSession(), max_concurrency=3)
+        resultat = await api.async_get_details_consumption(
+            PDL,
+            dt(2023, 3, 1, tzinfo=LOCAL_TIMEZONE),
+            dt(2023, 3, 29, tzinfo=LOCAL_TIMEZONE),
+        )
+    dates = [r["date"] for r in resultat["meter_reading"]["interval_reading"]]
+    assert dates == ["2023-03-01", "2023-03-08", "2023-03-15", "2023-03-22"]
+    assert max_in_flight == 3
+
+
+async def test_concurrent_details_error() -> None:
+    """Test readings after a failed chunk are dropped."""
+    responses = [
+        {"meter_reading": {"interval_reading": [{"date": "2023-03-01"}]}},
+        LimitReached(409, {"detail": "Limit reached"}),
+        {"meter_reading": {"interval_reading": [{"date": "2023-03-15"}]}},
+    ]
+    with patch.object(
+        myelectricaldatapy.Enedis, "async_fetch_datas", side_effect=responses
+    ):
+        api = Enedis(token=TOKEN, session=ClientSession(), max_concurrency=2)
+        resultat = await api.async_get_details_consumption(
+            PDL,
+            dt(2023, 3, 1, tzinfo=LOCAL_TIMEZONE),
+            dt(2023, 3, 22, tzinfo=LOCAL_TIMEZONE),
+        )
+    dates = [r["date"] for r in resultat["meter_reading"]["interval_reading"]]
+    assert dates == ["2023-03-01"]
+
+
+async def test_retry(mock_access) -> None:
+    """Test retry on quota and transient errors."""
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth,
+        "_async_request",
+        side_effect=[
+            LimitReached({"detail": "Limit reached"}),
+            TimeoutExceededError("Timeout"),
+            mock_access,
+        ],
+    ) as request:
+        api = Enedis(token=TOKEN, session=ClientSession(), retry=RetryPolicy(backoff=0))
+        resultat = await api.async_valid_access(PDL)
+        assert resultat["valid"] is True
+        assert request.call_count == 3
+
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth,
+        "_async_request",
+        side_effect=LimitReached({"detail": "Limit reached"}),
+    ) as request:
+        api = Enedis(
+            token=TOKEN,
+            session=ClientSession(),
+            retry=RetryPolicy(max_attempts=2, backoff=0),
+        )
+        with pytest.raises(LimitReached):
+            await api.async_valid_access(PDL)
+        assert request.call_count == 2
+
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth,
+        "_async_request",
+        side_effect=EnedisException({"detail": "Error"}),
+    ) as request:
+        api = Enedis(token=TOKEN, session=ClientSession(), retry=RetryPolicy(backoff=0))
+        with pytest.raises(EnedisException):
+            await api.async_valid_access(PDL)
+        assert request.call_count == 1
+
+
+async def test_token_bucket() -> None:
+    """Test rate limiter."""
+    bucket = TokenBucket(rate=100, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.async_acquire()
+    assert time.monotonic() - started >= 0.035
+
+    bucket.penalize()
+    assert bucket.rate == 50
+    bucket.reward()
+    assert bucket.rate == 60
+
+    first = get_bucket(TOKEN)
+    assert get_bucket(TOKEN) is first
+    assert TOKEN not in _BUCKETS
+    reset_buckets()
+    assert get_bucket(TOKEN) is not first
+    del first
+    gc.collect()
+    assert len(_BUCKETS) == 0
+
+
+@freeze_time("2023-03-10")
+async def test_cache(mock_detail, tmp_path) -> None:
+    """Test persistent cache of readings."""
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth, "async_request", return_value=mock_detail
+    ) as request:
+        cache = EnedisCache(tmp_path / "cache.db", ttl=0)
+        api = Enedis(token=TOKEN, session=ClientSession(), cache=cache)
+        # Past window with all its readings, kept forever.
+        start = dt(2023, 3, 1, tzinfo=LOCAL_TIMEZONE)
+        end = dt(2023, 3, 4, tzinfo=LOCAL_TIMEZONE)
+        await api.async_get_details_consumption(PDL, start, end)
+        # Shared between restarts.
+        api = Enedis(
+            token=TOKEN,
+            session=ClientSession(),
+            cache=EnedisCache(tmp_path / "cache.db", ttl=0),
+        )
+        resultat = await api.async_get_details_consumption(PDL, start, end)
+        assert request.call_count == 1
+        assert (
+            resultat["meter_reading"]["interval_reading"]
+            == (mock_detail["meter_reading"]["interval_reading"])
+        )
+
+        # Past window with readings not published yet, expired after ttl.
+        end = dt(2023, 3, 6, tzinfo=LOCAL_TIMEZONE)
+        await api.async_get_details_consumption(PDL, start, end)
+        await api.async_get_details_consumption(PDL, start, end)
+        assert request.call_count == 3
+
+        # Window including today, expired after ttl.
+        end = dt(2023, 3, 11, tzinfo=LOCAL_TIMEZONE)
+        await api.async_get_daily_consumption(PDL, start, end)
+        await api.async_get_daily_consumption(PDL, start, end)
+        assert request.call_count == 5
+
+        api.cache.ttl = 3600
+        await api.async_get_daily_consumption(PDL, start, end)
+        assert request.call_count == 5
+
+        # Not cached
+        await api.async_get_identity(PDL)
+        await api.async_get_identity(PDL)
+        assert request.call_count == 7
+
+        # Empty past window, expired after ttl.
+        api.cache.ttl = 0
+        request.return_value = {"meter_reading": {"interval_reading": []}}
+        end = dt(2023, 3, 2, tzinfo=LOCAL_TIMEZONE)
+        await api.async_get_daily_consumption(PDL, start, end)
+        await api.async_get_daily_consumption(PDL, start, end)
+        assert request.call_count == 9
+
+
+@freeze_time("2023-03-03")
+async def test_incremental_collects(mock_base: Mock) -> None:  # pylint: disable=unused-argument
+    """Test incremental collect."""
+
+    def daily(*readings: tuple[str, str]) -> dict[str, Any]:
+        return {
+            "meter_reading": {
+                "interval_reading": [
+                    {"date": day, "value": value} for day, value in readings
+                ]
+            }
+        }
+
+    with patch.object(
+        myelectricaldatapy.Enedis,
+        "async_get_daily_consumption",
+        side_effect=[
+            daily(("2023-03-01", "10"), ("2023-03-02", "20")),
+            daily(("2023-03-02", "25"), ("2023-03-03", "30")),
+            daily(),
+        ],
+    ) as fetch:
+        api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+        api.set_collects(
+            "daily_consumption",
+            start=dt(2023, 2, 1, tzinfo=LOCAL_TIMEZONE),
+            incremental=True,
+        )
+        await api.async_update_collects()
+        with freeze_time("2023-03-04"):
+            await api.async_update_collects()
+            assert fetch.call_args.args[1] == dt(2023, 3, 2, tzinfo=LOCAL_TIMEZONE)
+            assert fetch.call_args.args[2].date() == date(2023, 3, 5)
+            await api.async_update_collects()
+            assert fetch.call_args.args[1] == dt(2023, 3, 3, tzinfo=LOCAL_TIMEZONE)
+
+    assert api.has_collected is True
+    assert [(r["date"], r["value"]) for r in api._params["consumption"]["data"]] == [
+        ("2023-03-01", "10"),
+        ("2023-03-02", "25"),
+        ("2023-03-03", "30"),
+    ]
+
+
+async def test_incremental_collects_dst(mock_base: Mock) -> None:  # pylint: disable=unused-argument
+    """Test incremental collect restarted on the day DST ends."""
+    data = load_curve(dt(2023, 10, 27, 22), dt(2023, 10, 31, 23))
+    dates = [reading["date"] for reading in data]
+    first = data[: dates.index("2023-10-29 05:00:00") + 1]
+    # Collected again from the start of the day of the last reading.
+    second = data[dates.index("2023-10-29 00:30:00") :]
+    stats = {}
+    for incremental, batches in ((True, [first, second]), (False, [data])):
+        with (
+            patch.object(
+                myelectricaldatapy.Enedis,
+                "async_get_details_consumption",
+                side_effect=[
+                    {"meter_reading": {"interval_reading": batch}} for batch in batches
+                ],
+            ),
+            patch.object(EnedisAnalytics, "local_timezone", PARIS),
+        ):
+            api = EnedisByPDL(pdl=PDL, token=TOKEN, session=ClientSession())
+            api.set_collects(
+                "consumption_load_curve",
+                start=dt(2023, 10, 27, tzinfo=LOCAL_TIMEZONE),
+                end=None if incremental else dt(2023, 11, 1, tzinfo=LOCAL_TIMEZONE),
+                incremental=incremental,
+            )
+            for _ in batches:
+                await api.async_update_collects()
+            stats[incremental] = api.stats["consumption"]
+        assert len(api._params["consumption"]["data"]) == len(data)
+
+    assert stats[True] == stats[False]
+    assert sum(rslt["value"] for rslt in stats[True]) == pytest.approx(
+        sum(int(rslt["value"]) for rslt in data) / 2000
+    )
+
+
+async def test_single_flight(mock_contract, mock_tempo) -> None:
+    """Test identical concurrent requests share one call."""
+
+    async def request(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        if "tempo" in kwargs["path"]:
+            return mock_tempo
+        return mock_contract
+
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth, "async_request", side_effect=request
+    ) as mock_request:
+        api = Enedis(token=TOKEN, session=ClientSession())
+        contracts = await asyncio.gather(
+            *(api.async_get_contract(PDL) for _ in range(5))
+        )
+        assert mock_request.call_count == 1
+        assert all(contract == contracts[0] for contract in contracts)
+        assert api.offpeaks
+
+        start = dt(2023, 3, 1, tzinfo=LOCAL_TIMEZONE)
+        end = dt(2023, 3, 3, tzinfo=LOCAL_TIMEZONE)
+        await asyncio.gather(
+            api.async_get_tempo(start, end),
+            api.async_get_tempo(start, end),
+            api.async_get_tempo(start, dt(2023, 3, 4, tzinfo=LOCAL_TIMEZONE)),
+        )
+        assert mock_request.call_count == 3
+
+        # Sequential calls are not coalesced
+        await api.async_get_contract(PDL)
+        assert mock_request.call_count == 4
+
+    with patch.object(
+        myelectricaldatapy.auth.EnedisAuth,
+        "async_request",
+        side_effect=LimitReached({"detail": "Limit reached"}),
+    ) as mock_request:
+        api = Enedis(token=TOKEN, session=ClientSession())
+        results = await asyncio.gather(
+            api.async_fetch_datas("identity", PDL),
+            api.async_fetch_datas("identity", PDL),
+            return_exceptions=True,
+        )
+        assert mock_request.call_count == 1
+        assert all(isinstance(result, LimitReached) for result in results)
+
+
+@freeze_time("2023-03-01")
+async def test_fleet(mock_enedis: Mock, mock_access) -> None:  # pylint: disable=unused-argument
+    """Test fleet of PDL."""
+
+    async def valid_access(_api, pdl):
+        if pdl == "2":
+            raise LimitReached({"detail": "Limit reached"})
+        if pdl == "4":
+            raise KeyError("valid")
+        return mock_access
+
+    async with EnedisFleet(max_concurrency=2) as fleet:
+        for pdl in ("1", "2", "3", "4"):
+            fleet.add(pdl, TOKEN, [{"service": "consumption_load_curve"}])
+        assert fleet.pdls["1"]._api.auth.session is fleet.session
+
+        with patch.object(
+            myelectricaldatapy.Enedis, "async_valid_access", new=valid_access
+        ):
+            results = await fleet.async_update()
+
+        assert results["1"] is None
+        assert isinstance(results["2"], LimitReached)
+        assert results["3"] is None
+        assert isinstance(results["4"], KeyError)
+        fleet.remove("4")
+        assert "4" not in fleet.pdls
+        assert not fleet.session.closed
+        assert fleet.pdls["1"].has_collected is True
+        assert fleet.pdls["2"].has_collected is False
+        assert len(fleet.pdls["3"].stats["consumption"]) > 0
+
+        stats = {}
+        fleet.pdls["1"].invalidate_stats()
+        async for pdl, resultat in fleet.async_iter_stats(max_workers=2):
+            stats[pdl] = resultat
+        assert stats["1"] == stats["3"] == fleet.pdls["3"].stats
+        assert stats["2"] == {"consumption": []}
+        assert fleet.pdls["1"].stats is not stats["3"]
+        assert fleet.pdls["1"].stats["consumption"] is stats["1"]["consumption"]
+
+        with pytest.raises(ValueError):
+            async for _ in fleet.async_iter_stats("iter"):
+                pass
+
+        # Analytics failing for one connection point
+        fleet.pdls["1"].invalidate_stats()
+        fleet.pdls["3"].invalidate_stats()
+        fleet.pdls["3"]._params["consumption"]["intervals"] = [("bad", "time")]
+        stats = {}
+        async for pdl, resultat in fleet.async_iter_stats(max_workers=2):
+            stats[pdl] = resultat
+        assert isinstance(stats["3"], ValueError)
+        assert len(stats["1"]["consumption"]) > 0
+
+        for mypdl in fleet.pdls.values():
+            mypdl.invalidate_stats()
+        async with aclosing(fleet.async_iter_stats(max_workers=1)) as results:
+            async for _ in results:
+                break
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+
+async def test_decode_once(mock_access) -> None:
+    """Test body is read and decoded once."""
+    body = json.dumps(mock_access).encode()
+    response = Mock(
+        status=200,
+        headers={"Content-Type": "application/json"},
+        read=AsyncMock(return_value=body),
+        json=AsyncMock(),
+        text=AsyncMock(),
+    )
+    session = Mock(request=AsyncMock(return_value=response))
+    loads = Mock(side_effect=json.loads)
+    auth = EnedisAuth(session, TOKEN, json_loads=loads)
+
+    assert await auth.async_request("valid_access/1") == mock_access
+    loads.assert_called_once_with(body)
+    response.read.assert_awaited_once()
+    response.json.assert_not_called()
+    response.text.assert_not_called()
+
+    response.headers = {"Content-Type": "text/html"}
+    response.get_encoding = Mock(return_value="utf-8")
+    assert await auth.async_request("valid_access/1") == body.decode()
+
+    # Empty body, as response.json()
+    response.headers = {"Content-Type": "application/json"}
+    response.read = AsyncMock(return_value=b"")
+    assert await auth.async_request("valid_access/1") is None
+    response.status = 204
+    assert await auth.async_request("valid_access/1") is None
+    assert loads.call_count == 1
+
+
+async def test_stream_details(mock_detail) -> None:
+    """Test readings parsed while the body is received."""
+    body = load_fixture("detail.json").replace("B", "é").encode()
+    expected = json.loads(body)["meter_reading"]["interval_reading"]
+
+    parser = IntervalReadingParser()
+    readings = []
+    for i in range(0, len(body), 7):
+        readings.extend(parser.feed(body[i : i + 7]))
+    parser.close()
+    assert readings == expected
+
+    parser = IntervalReadingParser()
+    parser.feed(body[: len(body) // 2])
+    with pytest.raises(EnedisException):
+        parser.close()
+
+    async def stream(_auth, path, **kwargs):
+        for i in range(0, len(body), 1000):
+            yield body[i : i + 1000]
+
+    with patch.object(myelectricaldatapy.auth.EnedisAuth, "async_stream", new=stream):
+        api = Enedis(token=TOKEN, session=ClientSession())
+        start = dt(2023, 3, 1, tzinfo=LOCAL_TIMEZONE)
+        end = dt(2023, 3, 15, tzinfo=LOCAL_TIMEZONE)
+        readings = [
+            reading
+            async for reading in api.async_iter_details(
+                "consumption_load_curve", PDL, start, end
+            )
+        ]
+        assert readings == expected * 2
+
+        batches = [
+            batch
+            async for batch in api.async_iter_details(
+                "consumption_load_curve", PDL, start, end, batch_size=100
+            )
+        ]
+        assert [len(batch) for batch in batches[:-1]] == [100] * (len(batches) - 1)
+        assert [r for batch in batches for r in batch] == expected * 2
+
+
+async def test_stream_response() -> None:
+    """Test streamed request."""
+    body = [b'{"meter_reading":', b'{"interval_reading": []}}', b""]
+    response = Mock(status=200, content=Mock(read=AsyncMock(side_effect=body)))
+    session = Mock(request=AsyncMock(return_value=response))
+    auth = EnedisAuth(session, TOKEN)
+    assert [chunk async for chunk in auth.async_stream("path")] == body[:2]
+    response.release.assert_called_once()
+
+    response = Mock(
+        status=409,
+        headers={"Content-Type": "application/json"},
+        read=AsyncMock(return_value=b'{"detail": "Limit reached"}'),
+    )
+    session = Mock(request=AsyncMock(return_value=response))
+    auth = EnedisAuth(session, TOKEN)
+    with pytest.raises(LimitReached):
+        [chunk async for chunk in auth.async_stream("path")]
+
+
+def test_cold_import() -> None:
+    """Test the import of Enedis leaves out pandas and voluptuous."""
+    code = """
+import sys
+from myelectricaldatapy import Enedis
+print("Enedis", *sorted({"numpy", "pandas", "voluptuous"} & set(sys.modules)))
+import myelectricaldatapy
+myelectricaldatapy.EnedisByPDL
+print(*sorted({"numpy", "pandas", "voluptuous"} & set(sys.modules)))
+"""
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout.splitlines()
+    # What is loaded, not how long it takes (machine dependent).
+    assert output[0] == "Enedis"
+    assert output[1] == "numpy"